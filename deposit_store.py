@@ -0,0 +1,396 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+from itertools import groupby
+
+HISTORY_FILE = 'deposit_history.json'  # Old format, one JSON list rewritten on every deposit
+JOURNAL_FILE = 'deposit_history.jsonl'
+DATABASE_FILE = 'deposit_history.db'
+AGGREGATES_FILE = 'deposit_aggregates.json'
+CHECKPOINT_EVERY = 100
+CHECKPOINT = b'{"checkpoint": '
+TAIL_BLOCK = 64 * 1024
+
+class DepositJournal:
+    # Append-only deposit history: every deposit is one JSON line, so a deposit costs
+    # one small write no matter how long the history is. Every CHECKPOINT_EVERY
+    # deposits a checkpoint line with the count so far is written, load() only reads
+    # the file from the end back to the last checkpoint. The full history is only
+    # read when it is iterated (history window, CSV export).
+    def __init__(self, path=JOURNAL_FILE, legacy_path=HISTORY_FILE, checkpoint_every=CHECKPOINT_EVERY,
+                 database_path=DATABASE_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.database_path = database_path
+        self.checkpoint_every = checkpoint_every
+        self.count = 0
+        self._last = None
+        self._file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            if self.database_path and os.path.exists(self.database_path):
+                self.migrate_database()
+            elif os.path.exists(self.legacy_path):
+                self.migrate()
+        self.count, self._last = 0, None
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, 2)
+                size = f.tell()
+                tail, start = self._read_tail(f, size)
+        except FileNotFoundError:
+            return self
+
+        # Everything after the last checkpoint, a cut-off line from a crash is dropped
+        # and a complete last line without its newline gets one, otherwise the next
+        # append would continue that line
+        valid = start
+        for line in tail.split(b'\n'):
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            valid += len(line) + 1
+            if 'checkpoint' in entry:
+                self.count = entry['checkpoint']['deposits']
+            else:
+                self.count += 1
+                self._last = entry
+        if valid < size:
+            print(f"Dropping incomplete entry at the end of {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid)
+        elif valid > size:
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+        if self._last is None and self.count:
+            # The file ends with a checkpoint, the last deposit is the line before it
+            with open(self.path, 'rb') as f:
+                self._last = json.loads(self._line_before(f, start))
+        return self
+
+    def _read_tail(self, f, size):
+        # Reads blocks from the end until a complete checkpoint line is in them,
+        # returns the data from that checkpoint on and its offset in the file. A
+        # checkpoint torn by a crash is skipped, the one before it is used
+        position, data = size, b''
+        searched = None  # Checkpoints at or after this offset in `data` were rejected
+        while position > 0:
+            step = min(TAIL_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            if searched is not None:
+                searched += step
+            found = data.rfind(b'\n' + CHECKPOINT, 0, searched)
+            while found != -1:
+                end = data.find(b'\n', found + 1)
+                if end != -1 and self._is_checkpoint(data[found + 1:end]):
+                    return data[found + 1:], position + found + 1
+                searched = found
+                found = data.rfind(b'\n' + CHECKPOINT, 0, found)
+        return data, 0
+
+    def _is_checkpoint(self, line):
+        try:
+            return 'checkpoint' in json.loads(line)
+        except json.JSONDecodeError:
+            return False
+
+    def _line_before(self, f, offset):
+        position, data = offset - 1, b''
+        while position > 0 and b'\n' not in data:
+            step = min(TAIL_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+        return data[data.rfind(b'\n') + 1:]
+
+    def migrate(self):
+        # deposit_history.json -> journal, the old file is kept as a backup
+        try:
+            with open(self.legacy_path, 'r') as f:
+                deposits = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error migrating {self.legacy_path}: {e}")
+            return
+        count = self._write(deposits)
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+        print(f"Migrated {count} deposits from {self.legacy_path} to {self.path}")
+
+    def migrate_database(self):
+        # Back from SQLite (deposit_backend switched to journal again), the database
+        # is kept as a backup, switching to sqlite again migrates the journal back
+        store = SqliteDepositStore(self.database_path, self.path, self.legacy_path)
+        try:
+            store.open()
+            count = self._write(store)
+        except sqlite3.Error as e:
+            print(f"Error migrating {self.database_path}: {e}")
+            return
+        finally:
+            store.close()
+        os.replace(self.database_path, self.database_path + '.migrated')
+        print(f"Migrated {count} deposits from {self.database_path} to {self.path}")
+
+    def _write(self, deposits):
+        tmp_path = self.path + '.tmp'
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for count, deposit in enumerate(deposits, 1):
+                f.write(json.dumps(deposit) + '\n')
+                if count % self.checkpoint_every == 0:
+                    f.write(json.dumps({'checkpoint': {'deposits': count}}) + '\n')
+        os.replace(tmp_path, self.path)
+        return count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Oldest first, streamed from disk
+        if self._file is not None:
+            self._file.flush()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if 'checkpoint' not in entry:
+                        yield entry
+        except FileNotFoundError:
+            return
+
+    def between(self, first_day=None, last_day=None):
+        # Deposits with first_day <= day <= last_day (ISO days, None is open) ordered
+        # by day, the journal has no index, so this is a filtered full read
+        matches = []
+        for deposit in self:
+            day = iso_day(deposit.get('date'))
+            if (first_day is None or day >= first_day) and (last_day is None or day <= last_day):
+                matches.append((day, deposit))
+        matches.sort(key=lambda match: match[0])
+        return [deposit for day, deposit in matches]
+
+    def last(self):
+        return self._last
+
+    def totals(self):
+        # Per-product item counts and the deposit amount over the whole history
+        products, amount = {}, 0.0
+        for deposit in self:
+            for product, count in deposit['quantities'].items():
+                products[product] = products.get(product, 0) + count
+            amount += deposit.get('total', 0.0)
+        return products, amount
+
+    def append(self, deposit):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self.count += 1
+        line = json.dumps(deposit) + '\n'
+        if self.count % self.checkpoint_every == 0:
+            line += json.dumps({'checkpoint': {'deposits': self.count}}) + '\n'
+        self._file.write(line)
+        self._file.flush()
+        self._last = deposit
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.count, self._last = 0, None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposits (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    day TEXT NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deposit_quantities (
+    deposit_id INTEGER NOT NULL REFERENCES deposits(id) ON DELETE CASCADE,
+    product TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (deposit_id, product)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deposits_day ON deposits(day);
+CREATE INDEX IF NOT EXISTS deposit_quantities_product ON deposit_quantities(product, count);
+"""
+
+def iso_day(date):
+    # "31.12.2024" -> "2024-12-31", sortable for the date index
+    try:
+        return datetime.strptime(date, "%d.%m.%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return ""
+
+class SqliteDepositStore:
+    # Same interface as DepositJournal, backed by SQLite: one row per deposit and one
+    # row per product in deposit_quantities. Count, totals and the last deposit are
+    # single indexed queries, so the history can grow to 100k+ deposits
+    def __init__(self, path=DATABASE_FILE, journal_path=JOURNAL_FILE, legacy_path=HISTORY_FILE):
+        self.path = path
+        self.journal_path = journal_path
+        self.legacy_path = legacy_path
+        self._db = None
+
+    def open(self):
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(SCHEMA)
+        return self
+
+    def load(self):
+        self.open()
+        if not len(self) and (os.path.exists(self.journal_path) or os.path.exists(self.legacy_path)):
+            self.migrate()
+        return self
+
+    def migrate(self):
+        # Journal (or the old deposit_history.json, through the journal) -> database
+        journal = DepositJournal(self.journal_path, self.legacy_path, database_path=None).load()
+        with self._db:
+            for deposit in journal:
+                self._insert(deposit)
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self.journal_path + '.migrated')
+            print(f"Migrated {len(self)} deposits from {self.journal_path} to {self.path}")
+
+    def _insert(self, deposit):
+        date = deposit.get('date', '')
+        cursor = self._db.execute("INSERT INTO deposits (date, day, total) VALUES (?, ?, ?)",
+                                  (date, iso_day(date), deposit.get('total', 0.0)))
+        self._db.executemany("INSERT INTO deposit_quantities (deposit_id, product, count) VALUES (?, ?, ?)",
+                             [(cursor.lastrowid, product, count)
+                              for product, count in deposit['quantities'].items()])
+
+    def _deposits(self, rows):
+        # (id, date, total, product, count) rows ordered by id -> deposit dicts
+        for (deposit_id, date, total), group in groupby(rows, key=lambda row: row[:3]):
+            yield {'date': date,
+                   'quantities': {row[3]: row[4] for row in group if row[3] is not None},
+                   'total': total}
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM deposits").fetchone()[0]
+
+    def __iter__(self):
+        # Oldest first, rows are fetched lazily by the cursor
+        return self._deposits(self._db.execute(
+            "SELECT d.id, d.date, d.total, q.product, q.count FROM deposits d "
+            "LEFT JOIN deposit_quantities q ON q.deposit_id = d.id ORDER BY d.id"))
+
+    def between(self, first_day=None, last_day=None):
+        # Only the matching days are read, in day order, through the deposits_day index
+        return self._deposits(self._db.execute(
+            "SELECT d.id, d.date, d.total, q.product, q.count FROM deposits d "
+            "LEFT JOIN deposit_quantities q ON q.deposit_id = d.id "
+            "WHERE d.day BETWEEN ? AND ? ORDER BY d.day, d.id",
+            (first_day or "", last_day or "9999-12-31")))
+
+    def last(self):
+        return next(self._deposits(self._db.execute(
+            "SELECT d.id, d.date, d.total, q.product, q.count FROM deposits d "
+            "LEFT JOIN deposit_quantities q ON q.deposit_id = d.id "
+            "WHERE d.id = (SELECT MAX(id) FROM deposits)")), None)
+
+    def totals(self):
+        products = dict(self._db.execute(
+            "SELECT product, SUM(count) FROM deposit_quantities GROUP BY product"))
+        amount = self._db.execute("SELECT COALESCE(SUM(total), 0) FROM deposits").fetchone()[0]
+        return products, amount
+
+    def append(self, deposit):
+        with self._db:
+            self._insert(deposit)
+
+    def clear(self):
+        with self._db:
+            self._db.execute("DELETE FROM deposit_quantities")
+            self._db.execute("DELETE FROM deposits")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class DepositAggregates:
+    # Lifetime counters over the whole history, updated with every deposit and saved
+    # next to it. A deposit touches one counter per product, nothing is rescanned.
+    # When the saved deposit count does not match the store (old installation,
+    # migration, crash between the two writes) they are rebuilt from the store once
+    def __init__(self, path=AGGREGATES_FILE):
+        self.path = path
+        self.products = {}
+        self.items = 0
+        self.deposits = 0
+        self.amount = 0.0
+
+    def load(self, store):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.products = data['products']
+            self.items = data['items']
+            self.deposits = data['deposits']
+            self.amount = data['amount']
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Error reading {self.path}: {e}")
+            self.deposits = -1
+        if self.deposits != len(store):
+            self.rebuild(store)
+        return self
+
+    def rebuild(self, store):
+        self.products, self.amount = store.totals()
+        self.items = sum(self.products.values())
+        self.deposits = len(store)
+        self.save()
+
+    def add(self, deposit):
+        for product, count in deposit['quantities'].items():
+            self.products[product] = self.products.get(product, 0) + count
+            self.items += count
+        self.deposits += 1
+        self.amount += deposit.get('total', 0.0)
+        self.save()
+
+    def clear(self):
+        self.products, self.items, self.deposits, self.amount = {}, 0, 0, 0.0
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def save(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'products': self.products, 'items': self.items,
+                           'deposits': self.deposits, 'amount': self.amount}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
+
+DEPOSIT_BACKENDS = {
+    "journal": DepositJournal,
+    "sqlite": SqliteDepositStore,
+}
+
+def open_deposit_store(backend="journal"):
+    if backend not in DEPOSIT_BACKENDS:
+        print(f"Unknown deposit backend '{backend}', using 'journal'")
+        backend = "journal"
+    return DEPOSIT_BACKENDS[backend]().load()
@@ -14,13 +14,29 @@ import subprocess
 from datetime import datetime
 from tkcalendar import DateEntry
 import csv
-import cv2
-from pyzbar.pyzbar import decode
+from itertools import islice
+from scanutil.camera import SESSION_SUFFIX, camera_profile
+from scanutil.session import SessionRecorder, session_path
+from scanutil.validate import validation_summary
+from scanutil.daemon import EventClient
+from scanutil.pyramid import PyramidDecoder
+from scanutil.decoders import DecoderBackend
+from scanutil.preview import PreviewRenderer, tile_labels
+from scanutil.multicam import build_scanner
+from scanutil.metrics import ScannerMetrics
+from scanutil.preprocess import Preprocessor
+from scanutil.barcode_index import shared_index
+from scanutil.dedup import DedupCache
+from settings import load_settings
+from quantity_journal import shared_journal
+from deposit_store import DepositAggregates, DepositJournal, open_deposit_store
 import threading
+import multiprocessing
 import queue
-import numpy as np
 import shutil
 
+HISTORY_PAGE = 500  # Rows added to the history window per Tk callback
+
 class Achievement:
     def __init__(self, title, description, condition_type, condition_value):
         self.title = title
@@ -42,8 +58,16 @@ class PfandCalculator:
         self.images = {}
         self.spinboxes = {}  # Store spinbox references
         self.deposit_history = self.load_deposit_history()
-        self.scanned_barcodes = set()
+        # Lifetime counters for achievements and statistics, kept up to date per deposit
+        self.deposit_totals = DepositAggregates().load(self.deposit_history)
+        self.pending_barcodes = set()  # Barcodes with an open dialog
         self.barcode_history = []  # Store barcode scan history
+        self.barcode_index = shared_index()  # Barcode -> product, shared with µScan
+        
+        # Scan counters for achievements, scans come from the scanner window or the daemon
+        self.daily_scans = 0
+        self.total_scans = 0
+        self.last_scan_date = None
         
         self.achievements = self.initialize_achievements()
         self.load_achievements()
@@ -51,14 +75,29 @@ class PfandCalculator:
         if not os.path.exists('images'):
             os.makedirs('images')
             
+        # Scan-driven quantity changes are journaled and written to quantities.json in batches
+        self.storage_settings = load_settings('storage')
+        self.quantity_journal = shared_journal()  # Same journal and dict as µScan
+        
+        # Scan events from python -m scanutil.daemon, connected from the Scanner menu
+        self.daemon_client = None
+        self.daemon_settings = load_settings('daemon')
+        
         self.create_menu()
         self.load_quantities()
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(int(self.storage_settings['quantity_flush_interval_s'] * 1000), self.flush_quantities)
         
         # Scanner window
         self.scanner_window = None
-        self.cap = None
+        self.cameras = None
         self.scanning = False
+        self.camera_source = None  # A recorded session file instead of the configured cameras
+        self.recorder = None
+        self.scanner_settings = load_settings('scanner')
+        self.scan_dedup = DedupCache(self.scanner_settings['dedup_cooldown_s'],
+                                     self.scanner_settings['dedup_max_entries'])
         
         self.achievement_image = self.load_achievement_image()
 
@@ -159,13 +198,15 @@ class PfandCalculator:
             json.dump(data, f)
 
     def check_achievements(self):
-        total_elements = sum(self.deposit_history[-1]['quantities'].values()) if self.deposit_history else 0
-        all_time_total = sum(sum(d['quantities'].values()) for d in self.deposit_history)
-        deposits_count = len(self.deposit_history)
+        last_deposit = self.deposit_history.last()
+        total_elements = sum(last_deposit['quantities'].values()) if last_deposit else 0
+        all_time_total = self.deposit_totals.items
+        deposits_count = self.deposit_totals.deposits
         
+        # Counted over all deposits, not only the last one
         for achievement in ["each_100", "each_500", "each_1000"]:
             if not self.achievements[achievement].unlocked:
-                if all(self.deposit_history[-1]['quantities'][product] >= self.achievements[achievement].condition_value 
+                if all(self.deposit_totals.products.get(product, 0) >= self.achievements[achievement].condition_value 
                       for product in self.products):
                     self.unlock_achievement(achievement)
 
@@ -466,7 +507,7 @@ class PfandCalculator:
         file_menu.add_command(label="Updater", command=open_updater, accelerator="Strg+U") # Added this to the File Menu too!
         file_menu.add_separator()
         file_menu.add_command(label="Öffne PfandListe", command=WIKI.select_file, accelerator="Strg+L")
-        file_menu.add_command(label="Beenden", command=self.root.quit, accelerator="Strg+Q")
+        file_menu.add_command(label="Beenden", command=self.on_closing, accelerator="Strg+Q")
         file_menu.add_separator()
         file_menu.add_command(label="Über Programm", command=self.create_credits, accelerator="Strg+F10")
 
@@ -490,6 +531,11 @@ class PfandCalculator:
         scanner_menu.add_command(label="Über µScan", command=self.µScan_credits) #µScan credits
         scanner_menu.add_separator()
         scanner_menu.add_command(label="Barcodes Exportieren (CSV)", command=self.export_barcodes_csv, accelerator="Strg+Shift+E")
+        scanner_menu.add_command(label="Barcode Zuordnungen löschen", command=self.clear_barcode_index)
+        scanner_menu.add_separator()
+        self.daemon_var = tk.BooleanVar(value=self.daemon_client is not None)
+        scanner_menu.add_checkbutton(label="Mit Scanner Dienst verbinden", variable=self.daemon_var,
+                                     command=self.toggle_daemon_connection)
 
         # Achivements Menu
 
@@ -526,7 +572,7 @@ class PfandCalculator:
 
         self.root.bind('<Control-s>', lambda e: self.save_quantities())
         self.root.bind('<Control-o>', lambda e: self.open_file_location())
-        self.root.bind('<Control-q>', lambda e: self.root.quit())
+        self.root.bind('<Control-q>', lambda e: self.on_closing())
         self.root.bind('<Control-d>', lambda e: self.quick_deposit())
         self.root.bind('<Control-h>', lambda e: self.show_deposit_history())
         self.root.bind('<Control-e>', lambda e: self.export_history_csv())
@@ -561,8 +607,9 @@ class PfandCalculator:
             if messagebox.askyesno("Löschen bestätigen", "Sind Sie sicher, dass Sie die Speicherdatei löschen möchten?"):
                 try:
                     os.remove('quantities.json')
+                    self.quantity_journal.discard()
                     messagebox.showinfo("Erfolg", "Speicherdatei wurde erfolgreich gelöscht!")
-                    self.quantities = {product: 0 for product in self.products}
+                    self.reset_quantities()
                     self.update_total()
                     for widget in self.root.winfo_children():
                         if isinstance(widget, ttk.Frame):
@@ -577,20 +624,30 @@ class PfandCalculator:
             messagebox.showinfo("Info", "Keine Speicherdatei vorhanden.")
 
     def load_quantities(self):
-        try:
-            with open('quantities.json', 'r') as f:
-                self.quantities = json.load(f)
-        except FileNotFoundError:
-            self.quantities = {product: 0 for product in self.products}
+        # Also replays scans from the journal that were not flushed yet
+        self.quantities = self.quantity_journal.load({product: 0 for product in self.products})
+
+    def reset_quantities(self):
+        # Changed in place, µScan counts into the same dict
+        self.quantities.clear()
+        self.quantities.update({product: 0 for product in self.products})
     
     def save_quantities(self):
         try:
-            with open('quantities.json', 'w') as f:
-                json.dump(self.quantities, f)
+            self.quantity_journal.flush(self.quantities, force=True)
             messagebox.showinfo("Erfolg", "Mengen wurden erfolgreich gespeichert!")
         except Exception as e:
             messagebox.showerror("Fehler", f"Fehler beim Speichern der Mengen: {str(e)}")
     
+    def flush_quantities(self, reschedule=True):
+        # Write-behind for scans, runs on a timer and on exit, no popups
+        try:
+            self.quantity_journal.flush(self.quantities)
+        except Exception as e:
+            print(f"Error flushing quantities: {e}")
+        if reschedule:
+            self.root.after(int(self.storage_settings['quantity_flush_interval_s'] * 1000), self.flush_quantities)
+    
     def create_widgets(self):
         main_frame = ttk.Frame(self.root)
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -647,40 +704,49 @@ class PfandCalculator:
         self.total_label.config(text=f"Gesamt: €{total:.2f}")
 
     def load_deposit_history(self):
+        # Journal or SQLite, older history files are migrated on the first start
         try:
-            with open('deposit_history.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+            return open_deposit_store(load_settings('storage')['deposit_backend'])
+        except Exception as e:
+            print(f"Error loading deposit history: {e}")
+            return DepositJournal()
 
-    def save_deposit_history(self):
+    def record_deposit(self, deposit_record):
+        # One appended line per deposit instead of rewriting the whole history
         try:
-            with open('deposit_history.json', 'w') as f:
-                json.dump(self.deposit_history, f)
+            self.deposit_history.append(deposit_record)
+            self.deposit_totals.add(deposit_record)
         except Exception as e:
             messagebox.showerror("Fehler", f"Fehler beim Speichern der Historie: {str(e)}")
 
     # Changed in Version 7.4.101
     def show_deposit_history(self):
-        try:
-            with open("deposit_history.json", "r", encoding="utf-8") as file:
-                deposit_history = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print("error while loading file")
+        if not self.deposit_history:
+            print("no deposit history")
             return
+        # Column sums come from the lifetime counters, the rows are streamed into the tree
+        item_totals, total_amount = self.deposit_totals.products, self.deposit_totals.amount
 
         history_window = tk.Toplevel(self.root)
         history_window.title("Pfand Abgabe Historie")
         history_window.geometry("900x500")
 
+        # Date range, the SQLite store reads only these days through its date index
+        filter_frame = ttk.Frame(history_window)
+        filter_frame.pack(fill=tk.X, padx=5, pady=(5, 0))
+        ttk.Label(filter_frame, text="Von:").pack(side=tk.LEFT)
+        first_picker = DateEntry(filter_frame, width=12, background='darkblue',
+                                 foreground='white', borderwidth=2, locale='de_DE')
+        first_picker.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="Bis:").pack(side=tk.LEFT)
+        last_picker = DateEntry(filter_frame, width=12, background='darkblue',
+                                foreground='white', borderwidth=2, locale='de_DE')
+        last_picker.pack(side=tk.LEFT, padx=5)
+
         main_frame = ttk.Frame(history_window)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        all_items = set()
-        for deposit in deposit_history:
-            all_items.update(deposit['quantities'].keys())
-
-        item_columns = sorted(all_items)
+        item_columns = sorted(item_totals)
         columns = ['Datum'] + item_columns + ['Gesamt']
 
         tree = ttk.Treeview(main_frame, columns=columns, show='headings')
@@ -699,21 +765,6 @@ class PfandCalculator:
         main_frame.grid_columnconfigure(0, weight=1)
         main_frame.grid_rowconfigure(0, weight=1)
 
-        totals = {item: 0 for item in item_columns}
-        total_amount = 0
-
-        for deposit in deposit_history:
-            quantities = deposit.get('quantities', {})
-            row = [deposit.get('date', '')]
-            for item in item_columns:
-                count = quantities.get(item, 0)
-                row.append(count)
-                totals[item] += count
-            amount = deposit.get('total', 0.0)
-            row.append(f"{amount:.2f}")
-            total_amount += amount
-            tree.insert('', tk.END, values=row)
-
         totals_frame = ttk.Frame(main_frame)
         totals_frame.grid(row=1, column=0, sticky='ew', pady=(5, 0))
 
@@ -722,12 +773,60 @@ class PfandCalculator:
 
         bold_font = ('TkDefaultFont', 9, 'bold')
 
-        row = ["Gesamt:"]
-        for item in item_columns:
-            row.append(f"{totals[item]} {item}")  
-        row.append(f"€{total_amount:.2f}")  
-        for idx, value in enumerate(row):
-            ttk.Label(totals_frame, text=value, font=bold_font).grid(row=0, column=idx, sticky='w', padx=5)
+        def show_totals(products, amount):
+            for label in totals_frame.winfo_children():
+                label.destroy()
+            row = ["Gesamt:"]
+            for item in item_columns:
+                row.append(f"{products.get(item, 0)} {item}")
+            row.append(f"€{amount:.2f}")
+            for idx, value in enumerate(row):
+                ttk.Label(totals_frame, text=value, font=bold_font).grid(row=0, column=idx, sticky='w', padx=5)
+
+        # Rows go into the tree a page per Tk callback, the window stays usable while a
+        # long history loads. A new range stops the previous load
+        shown = {'load': 0, 'range': (None, None)}
+
+        def insert_page(rows, load, sums):
+            if load != shown['load'] or not history_window.winfo_exists():
+                return
+            inserted = 0
+            for deposit in islice(rows, HISTORY_PAGE):
+                quantities = deposit.get('quantities', {})
+                row = [deposit.get('date', '')]
+                for item in item_columns:
+                    row.append(quantities.get(item, 0))
+                row.append(f"{deposit.get('total', 0.0):.2f}")
+                tree.insert('', tk.END, values=row)
+                if sums is not None:
+                    for item, count in quantities.items():
+                        sums[0][item] = sums[0].get(item, 0) + count
+                    sums[1] += deposit.get('total', 0.0)
+                inserted += 1
+            if inserted == HISTORY_PAGE:
+                history_window.after(1, insert_page, rows, load, sums)
+            elif sums is not None:
+                show_totals(*sums)
+
+        def load_rows(first_day=None, last_day=None):
+            shown['load'] += 1
+            shown['range'] = (first_day, last_day)
+            tree.delete(*tree.get_children())
+            if first_day is None and last_day is None:
+                show_totals(item_totals, total_amount)
+                insert_page(iter(self.deposit_history), shown['load'], None)
+            else:
+                insert_page(iter(self.deposit_history.between(first_day, last_day)), shown['load'], [{}, 0.0])
+
+        def load_range():
+            load_rows(first_picker.get_date().strftime("%Y-%m-%d"), last_picker.get_date().strftime("%Y-%m-%d"))
+
+        ttk.Button(filter_frame, text="Anzeigen", command=load_range).pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Alle", command=load_rows).pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Exportieren",
+                   command=lambda: self.export_history_csv(*shown['range'])).pack(side=tk.RIGHT)
+
+        load_rows()
 
         separator.grid(row=3, column=0, sticky='ew', pady=5)
 
@@ -753,10 +852,9 @@ class PfandCalculator:
                 'quantities': dict(self.quantities),
                 'total': current_total
             }
-            self.deposit_history.append(deposit_record)
-            self.save_deposit_history()
+            self.record_deposit(deposit_record)
 
-            self.quantities = {product: 0 for product in self.products}
+            self.reset_quantities()
             self.save_quantities()
             self.update_total()
 
@@ -791,12 +889,11 @@ class PfandCalculator:
                 'quantities': dict(self.quantities),
                 'total': current_total
             }
-            self.deposit_history.append(deposit_record)
-            self.save_deposit_history()
+            self.record_deposit(deposit_record)
             
             self.check_achievements()
 
-            self.quantities = {product: 0 for product in self.products}
+            self.reset_quantities()
             self.save_quantities()
             self.update_total()
 
@@ -812,7 +909,8 @@ class PfandCalculator:
         else:
             self.make_deposit()
 
-    def export_history_csv(self):
+    def export_history_csv(self, first_day=None, last_day=None):
+        # Whole history or the days first_day..last_day (ISO dates) shown in the history window
         if not self.deposit_history:
             messagebox.showinfo("Info", "Keine Historie zum Exportieren vorhanden.")
             return
@@ -834,7 +932,11 @@ class PfandCalculator:
                 header = ['Datum'] + self.products + ['Gesamt (€)']
                 writer.writerow(header)
                 
-                for deposit in self.deposit_history:
+                if first_day is None and last_day is None:
+                    deposits = self.deposit_history
+                else:
+                    deposits = self.deposit_history.between(first_day, last_day)
+                for deposit in deposits:
                     # Create row with all products
                     row = [deposit['date']]
                     for product in self.products:
@@ -855,9 +957,8 @@ class PfandCalculator:
                               "Sind Sie sicher, dass Sie die gesamte Abgabe-Historie löschen möchten?\n"
                               "Dieser Vorgang kann nicht rückgängig gemacht werden!"):
             try:
-                self.deposit_history = []
-                if os.path.exists('deposit_history.json'):
-                    os.remove('deposit_history.json')
+                self.deposit_history.clear()
+                self.deposit_totals.clear()
                 messagebox.showinfo("Erfolg", "Abgabe-Historie wurde erfolgreich gelöscht!")
             except Exception as e:
                 messagebox.showerror("Fehler", f"Fehler beim Löschen der Historie: {str(e)}")
@@ -897,25 +998,26 @@ class PfandCalculator:
             
             # Create frames for scanner layout
             self.camera_frame = ttk.Frame(self.scanner_window)
-            self.camera_frame.pack(side="left", padx=10, pady=5)
+            self.camera_frame.pack(side="left", padx=10, pady=5, fill="both", expand=True)
             
             self.scanner_control_frame = ttk.Frame(self.scanner_window)
             self.scanner_control_frame.pack(side="left", padx=10, pady=5, fill="y")
             
-            # Create camera label
-            self.camera_label = ttk.Label(self.camera_frame)
-            self.camera_label.pack()
+            # One preview tile per camera, created when scanning starts
             
             # Create focus control
             focus_frame = ttk.LabelFrame(self.scanner_control_frame, text="Kamera Einstellungen")
             focus_frame.pack(pady=5, padx=5, fill="x")
             
+            # Starts with the focus saved for this camera the last time
+            profile = camera_profile(0)
             ttk.Label(focus_frame, text="Fokus:").pack(pady=2)
             self.focus_slider = ttk.Scale(focus_frame, from_=0, to=255, orient="horizontal")
-            self.focus_slider.set(0)
+            self.focus_slider.set(profile['focus'])
+            self.focus_slider.configure(command=self.change_focus)
             self.focus_slider.pack(pady=2, padx=5, fill="x")
             
-            self.autofocus_var = tk.BooleanVar(value=True)
+            self.autofocus_var = tk.BooleanVar(value=profile['autofocus'])
             self.autofocus_check = ttk.Checkbutton(
                 focus_frame,
                 text="Autofokus",
@@ -946,10 +1048,33 @@ class PfandCalculator:
             )
             self.scan_button.pack(pady=10)
             
-            # Initialize scan counter for achievements
-            self.daily_scans = 0
-            self.total_scans = 0
-            self.last_scan_date = None
+            # Record the camera to a session file, or scan a recorded session instead of the camera
+            session_frame = ttk.LabelFrame(self.scanner_control_frame, text="Aufnahme")
+            session_frame.pack(pady=5, padx=5, fill="x")
+            self.record_button = ttk.Button(session_frame, text="Aufnahme Starten", command=self.toggle_recording)
+            self.record_button.pack(pady=2, fill="x")
+            ttk.Button(session_frame, text="Aufnahme Abspielen", command=self.replay_session).pack(pady=2, fill="x")
+            # Full speed decodes every recorded frame, as fast as the decoder manages
+            self.replay_fast_var = tk.BooleanVar(value=not self.scanner_settings['replay_realtime'])
+            ttk.Checkbutton(
+                session_frame,
+                text="Volle Geschwindigkeit",
+                variable=self.replay_fast_var,
+                command=self.toggle_replay_speed
+            ).pack(pady=2)
+            
+            # Current decode rate and backlog
+            self.scanner_status_label = ttk.Label(self.scanner_control_frame, text="", wraplength=250)
+            self.scanner_status_label.pack(pady=5)
+            
+            # FPS, decode time, queue depth and dropped frames on the preview itself
+            self.overlay_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(
+                self.scanner_control_frame,
+                text="Messwerte einblenden",
+                variable=self.overlay_var,
+                command=self.toggle_overlay
+            ).pack(pady=2)
             
             # Queue for thread-safe communication
             self.queue = queue.Queue()
@@ -960,116 +1085,214 @@ class PfandCalculator:
     def close_scanner_window(self):
         if self.scanning:
             self.toggle_scanning()
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.recorder:
+            self.toggle_recording()
         if self.scanner_window:
             self.scanner_window.destroy()
             self.scanner_window = None
 
     def toggle_scanning(self):
         if not self.scanning:
-            self.cap = cv2.VideoCapture(0)
+            # Capture and decoding run in background threads, Tk only polls the results
+            self.preprocessor = Preprocessor(self.scanner_settings['preprocess_profile'])
+            self.adjust_image()
+            
+            # Per-stage timings, written to metrics_file for later analysis
+            self.metrics = ScannerMetrics('scanner', self.scanner_settings['metrics_file'],
+                                          self.scanner_settings['metrics_interval_s'])
+            self.preprocessor.metrics = self.metrics
             
-            # Set optimal camera properties for performance
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)  # Request 30 FPS
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer delay
+            # Downscaled first, full resolution only on the likely barcode region
+            # pyzbar, OpenCV's detector, or auto: both tried per camera, the better one kept
+            self.backend = DecoderBackend(self.scanner_settings['decoder'])
+            self.pyramid = PyramidDecoder(self.backend, self.scanner_settings['pyramid_scales'],
+                                          full_fallback=self.scanner_settings['pyramid_full_fallback'])
             
-            self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-            self.cap.set(cv2.CAP_PROP_FOCUS, 0)
+            # Every camera gets its own capture subscription, decode worker and preview tile
+            sources = [self.camera_source] if self.camera_source else self.scanner_settings['cameras']
+            labels, tile_size = tile_labels(self.camera_frame, len(sources),
+                                            self.scanner_settings['preview_max_size'])
+            self.cameras = build_scanner(
+                self.scanner_settings, sources, self.detect_barcodes, self.backend, self.metrics,
+                lambda index, source: PreviewRenderer(labels[index], tile_size,
+                                                      self.scanner_settings['preview_fps'], self.metrics))
+            self.toggle_autofocus()
+            self.toggle_overlay()
+            self.cameras.start()
             
             self.scanning = True
             self.scan_button.configure(text="Scannen Stoppen")
             self.process_video()
         else:
             self.scanning = False
-            if self.cap:
-                self.cap.release()
-            self.cap = None
+            if self.cameras:
+                self.cameras.stop()
+                self.cameras.clear()
+                # Last, shorter interval is written too
+                if self.metrics.path:
+                    self.metrics.export(self.cameras.stats(), decoders=self.cameras.decoder_stats())
+            self.cameras = None
+            self.camera_source = None
             self.scan_button.configure(text="Scannen Starten")
-            self.camera_label.configure(image='')
+            self.scanner_status_label.configure(text="")
+
+    def toggle_recording(self):
+        # Frames come from the shared camera, recording works with or without scanning
+        if self.recorder is None:
+            self.recorder = SessionRecorder(session_path())
+            self.recorder.start()
+            self.record_button.configure(text="Aufnahme Stoppen")
+        else:
+            self.recorder.stop()
+            print(f"Aufnahme gespeichert: {self.recorder.path} ({self.recorder.frames} Frames)")
+            self.recorder = None
+            self.record_button.configure(text="Aufnahme Starten")
+
+    def replay_session(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Scanner Aufnahme", "*" + SESSION_SUFFIX), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        if self.scanning:
+            self.toggle_scanning()
+        # Played back through the same pipeline as the camera, in real time or at full speed
+        self.camera_source = file_path
+        self.toggle_scanning()
 
     def toggle_autofocus(self):
-        if self.cap:
+        if self.cameras:
             if self.autofocus_var.get():
-                self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
+                self.cameras.autofocus = True
                 self.focus_slider.state(['disabled'])
             else:
-                self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+                self.cameras.autofocus = False
                 self.focus_slider.state(['!disabled'])
-                self.cap.set(cv2.CAP_PROP_FOCUS, self.focus_slider.get())
+                self.cameras.focus = self.focus_slider.get()
 
-    def adjust_image(self, frame):
-        # This method is now only used for preview adjustments
-        brightness = self.brightness_slider.get() / 50.0 - 1.0
-        contrast = self.contrast_slider.get() / 50.0
-        
-        adjusted = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness * 127)
-        return adjusted
+    def toggle_replay_speed(self):
+        # Used by the next replay
+        self.scanner_settings['replay_realtime'] = not self.replay_fast_var.get()
+
+    def toggle_overlay(self):
+        if self.cameras:
+            self.cameras.overlay = self.overlay_var.get()
+
+    def change_focus(self, value):
+        # Only slider moves reach the camera, not every frame
+        if self.cameras and not self.autofocus_var.get():
+            self.cameras.focus = float(value)
+
+    def adjust_image(self):
+        # The lookup table is only rebuilt when a slider moved, the decode worker applies it
+        self.preprocessor.set_levels(self.brightness_slider.get(), self.contrast_slider.get())
+
+    def detect_barcodes(self, frame):
+        # Runs in the decode worker thread, must not touch any Tk widgets
+        # Process in grayscale for better performance
+        gray = self.preprocessor.apply(frame)
+        return self.pyramid.decode(gray)
 
     def process_video(self):
         if not self.scanning:
             return
+        self.metrics.polled()
             
         try:
-            ret, frame = self.cap.read()
-            if ret:
-                if not self.autofocus_var.get():
-                    self.cap.set(cv2.CAP_PROP_FOCUS, self.focus_slider.get())
-                
-                # Resize frame for faster processing (720p is plenty for barcode detection)
-                frame = cv2.resize(frame, (1280, 720))
-                
-                # Only process every 3rd frame for barcode detection
-                if hasattr(self, 'frame_count'):
-                    self.frame_count += 1
-                else:
-                    self.frame_count = 0
-                
-                if self.frame_count % 3 == 0:  # Process every 3rd frame
-                    # Process in grayscale for better performance
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    barcodes = decode(gray)
-                    
-                    for barcode in barcodes:
-                        points = barcode.polygon
-                        if len(points) == 4:
-                            pts = np.array([(p.x, p.y) for p in points])
-                            cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
-                    
-                        barcode_data = barcode.data.decode('utf-8')
-                        if barcode_data not in self.scanned_barcodes:
-                            self.scanned_barcodes.add(barcode_data)
-                            self.scanner_window.after(0, lambda d=barcode_data: self.handle_barcode(d))
-                
-                # Convert and display frame
-                cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-                img = Image.fromarray(cv2image)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.camera_label.imgtk = imgtk
-                self.camera_label.configure(image=imgtk)
+            self.adjust_image()
+
+            # Only finished decode results come back to the Tk thread, from all cameras
+            # into one dedup cache, so a bottle seen by two cameras counts once
+            for tile, frame_id, barcodes in self.cameras.drain():
+                for barcode in barcodes:
+                    barcode_data = barcode.data.decode('utf-8')
+                    # Same item still in view (the sighting is recorded even while a
+                    # dialog is open for it, so it is not counted right after the dialog)
+                    if self.scan_dedup.accept(barcode_data):
+                        self.route_barcode(barcode_data)
+
+            if self.cameras.render():
+                self.scanner_status_label.configure(
+                    text=f"{self.cameras.status_text()}\n{self.pyramid.summary()}\n"
+                         f"{validation_summary(self.cameras.validators)}\n"
+                         f"Vorverarbeitung: {self.preprocessor.avg_ms:.1f} ms")
+            
+            if self.metrics.export_due():
+                self.metrics.export(self.cameras.stats(), decoders=self.cameras.decoder_stats())
             
             if self.scanning:
-                # Use a shorter delay for higher frame rate
-                self.scanner_window.after(5, self.process_video)
+                delay = self.cameras.poll_interval_ms()
+                self.metrics.scheduled(delay)
+                self.scanner_window.after(delay, self.process_video)
         except Exception as e:
             print(f"Error in process_video: {e}")
+            self.metrics.error()
             if self.scanning:
-                self.scanner_window.after(5, self.process_video)
+                self.metrics.scheduled(15)
+                self.scanner_window.after(15, self.process_video)
+
+    def route_barcode(self, barcode_data):
+        # A new sighting, from the scanner window or from the scanner daemon
+        if barcode_data in self.pending_barcodes:
+            return  # A dialog is still open for it
+        entry = self.barcode_index.get(barcode_data)
+        if entry is None:
+            self.pending_barcodes.add(barcode_data)
+            self.root.after(0, lambda d=barcode_data: self.handle_barcode(d))
+        else:
+            self.handle_known_barcode(barcode_data, entry)
+
+    def toggle_daemon_connection(self):
+        if self.daemon_var.get():
+            url = f"http://{self.daemon_settings['host']}:{self.daemon_settings['port']}/events"
+            self.daemon_client = EventClient(url, timeout_s=self.daemon_settings['heartbeat_s'] * 3)
+            self.daemon_client.start()
+            self.poll_daemon_events()
+        elif self.daemon_client:
+            self.daemon_client.stop()
+            self.daemon_client = None
+
+    def poll_daemon_events(self):
+        # The daemon already confirmed and deduplicated the scans
+        if self.daemon_client is None:
+            return
+        try:
+            while True:
+                try:
+                    event = self.daemon_client.events.get_nowait()
+                except queue.Empty:
+                    break
+                if event.get('type') == 'scan':
+                    self.route_barcode(event['barcode'])
+        except Exception as e:
+            print(f"Error handling scanner events: {e}")
+        finally:
+            # Keeps polling no matter what one event did
+            self.root.after(100, self.poll_daemon_events)
+
+    def handle_known_barcode(self, barcode_data, entry):
+        # Barcode is in the index, no dialogs needed
+        self.barcode_history.append({
+            'timestamp': datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+            'barcode': barcode_data,
+            'has_pfand': entry['has_pfand']
+        })
+        if entry['has_pfand'] and entry['product'] in self.products:
+            self.add_scanned_product(entry['product'])
 
     def handle_barcode(self, barcode_data):
         # First dialog for Pfand symbol verification
-        verify_dialog = tk.Toplevel(self.scanner_window)
+        verify_dialog = tk.Toplevel(self.scanner_window or self.root)
         verify_dialog.title("Pfand Symbol Überprüfung")
-        verify_dialog.transient(self.scanner_window)
+        verify_dialog.transient(self.scanner_window or self.root)
         verify_dialog.grab_set()
         
         ttk.Label(verify_dialog, text="Ist ein Pfand Symbol auf dem Produkt?").pack(pady=10)
         
         def handle_verification(has_pfand):
             verify_dialog.destroy()
+            if not has_pfand:
+                self.pending_barcodes.discard(barcode_data)
             if has_pfand:
                 # Add barcode to history with timestamp and Pfand status
                 self.barcode_history.append({
@@ -1085,18 +1308,25 @@ class PfandCalculator:
                     'barcode': barcode_data,
                     'has_pfand': False
                 })
-                self.scanned_barcodes.remove(barcode_data)
+                self.barcode_index.remember(barcode_data, None, False)
                 messagebox.showinfo("Kein Pfand", "Dieses Produkt hat kein Pfand Symbol.")
         
+        def cancel():
+            self.pending_barcodes.discard(barcode_data)
+            self.scan_dedup.forget(barcode_data)
+            verify_dialog.destroy()
+        
+        verify_dialog.protocol("WM_DELETE_WINDOW", cancel)
+        
         button_frame = ttk.Frame(verify_dialog)
         button_frame.pack(pady=10)
         ttk.Button(button_frame, text="Ja", command=lambda: handle_verification(True)).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Nein", command=lambda: handle_verification(False)).pack(side=tk.LEFT, padx=5)
 
     def show_product_selection_dialog(self, barcode_data):
-        dialog = tk.Toplevel(self.scanner_window)
+        dialog = tk.Toplevel(self.scanner_window or self.root)
         dialog.title("Barcode Erkannt")
-        dialog.transient(self.scanner_window)
+        dialog.transient(self.scanner_window or self.root)
         dialog.grab_set()
         
         ttk.Label(dialog, text=f"Barcode erkannt: {barcode_data}").pack(pady=10)
@@ -1109,46 +1339,55 @@ class PfandCalculator:
         def confirm():
             selected_product = product_var.get()
             if selected_product:
-                print(f"Erhöhe {selected_product}")  # Debug print
-                # Update quantity
-                current_qty = self.quantities.get(selected_product, 0)
-                self.quantities[selected_product] = current_qty + 1
-                print(f"Neue Menge für {selected_product}: {self.quantities[selected_product]}")  # Debug print
-                
-                # Update scan counters and check achievements
-                self.update_scan_achievements()
-                
-                # Force immediate UI update
-                def do_update():
-                    try:
-                        # Directly update the spinbox
-                        spinbox = self.spinboxes[selected_product]
-                        spinbox.set(str(self.quantities[selected_product]))
-                        spinbox.update()  # Force the spinbox to update
-                        
-                        # Update the total
-                        self.update_total()
-                        self.root.update_idletasks()  # Force the entire UI to update
-                        
-                        # Save the quantities
-                        self.save_quantities()
-                        print("UI Update und Speicherung abgeschlossen")  # Debug print
-                    except Exception as e:
-                        print(f"Fehler beim UI Update: {e}")
-                
-                # Schedule the update for the next event loop iteration
-                self.root.after(1, do_update)
+                # Next time this barcode is counted without any dialog
+                self.barcode_index.remember(barcode_data, selected_product, True)
+                self.pending_barcodes.discard(barcode_data)
+                self.add_scanned_product(selected_product)
                 dialog.destroy()
         
         def skip():
-            self.scanned_barcodes.remove(barcode_data)
+            self.pending_barcodes.discard(barcode_data)
+            self.scan_dedup.forget(barcode_data)
             dialog.destroy()
         
+        dialog.protocol("WM_DELETE_WINDOW", skip)
+        
         button_frame = ttk.Frame(dialog)
         button_frame.pack(pady=10)
         ttk.Button(button_frame, text="Hinzufügen", command=confirm).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Überspringen", command=skip).pack(side=tk.LEFT, padx=5)
 
+    def add_scanned_product(self, selected_product):
+        print(f"Erhöhe {selected_product}")  # Debug print
+        # Update quantity
+        current_qty = self.quantities.get(selected_product, 0)
+        self.quantities[selected_product] = current_qty + 1
+        print(f"Neue Menge für {selected_product}: {self.quantities[selected_product]}")  # Debug print
+        
+        # One appended journal line, quantities.json is written later by flush_quantities
+        self.quantity_journal.record(selected_product, self.quantities[selected_product])
+        
+        # Update scan counters and check achievements
+        self.update_scan_achievements()
+        
+        # Force immediate UI update
+        def do_update():
+            try:
+                # Directly update the spinbox
+                spinbox = self.spinboxes[selected_product]
+                spinbox.set(str(self.quantities[selected_product]))
+                spinbox.update()  # Force the spinbox to update
+        
+                # Update the total
+                self.update_total()
+                self.root.update_idletasks()  # Force the entire UI to update
+                print("UI Update abgeschlossen")  # Debug print
+            except Exception as e:
+                print(f"Fehler beim UI Update: {e}")
+        
+        # Schedule the update for the next event loop iteration
+        self.root.after(1, do_update)
+
     def update_scan_achievements(self):
         current_date = datetime.now().strftime("%Y-%m-%d")
         
@@ -1186,9 +1425,6 @@ class PfandCalculator:
             if self.daily_scans == count and not self.achievements[achievement_key].unlocked:
                 self.unlock_achievement(achievement_key)
                 self.save_achievements()
-        
-        # Save the updated scan counts
-        self.save_quantities()  # This ensures we don't lose progress
 
     def update_ui(self):
         def update_spinboxes():
@@ -1223,8 +1459,27 @@ class PfandCalculator:
     def on_closing(self):
         if self.scanner_window and self.scanner_window.winfo_exists():
             self.close_scanner_window()
+        if self.daemon_client:
+            self.daemon_client.stop()
+        self.flush_quantities(reschedule=False)
+        self.deposit_history.close()
         self.root.destroy()
 
+    def clear_barcode_index(self):
+        if not self.barcode_index.entries:
+            messagebox.showinfo("Info", "Keine Barcode Zuordnungen vorhanden.")
+            return
+
+        if messagebox.askyesno("Löschen bestätigen", 
+                              f"Sollen alle {len(self.barcode_index.entries)} gespeicherten Barcode Zuordnungen gelöscht werden?\n"
+                              "Bekannte Barcodes müssen danach wieder zugeordnet werden."):
+            try:
+                self.barcode_index.clear()
+                self.scan_dedup.clear()
+                messagebox.showinfo("Erfolg", "Barcode Zuordnungen wurden gelöscht!")
+            except Exception as e:
+                messagebox.showerror("Fehler", f"Fehler beim Löschen der Zuordnungen: {str(e)}")
+
     def export_barcodes_csv(self):
         if not self.barcode_history:
             messagebox.showinfo("Info", "Keine Barcodes zum Exportieren vorhanden.")
@@ -1564,6 +1819,7 @@ class PfandCalculator:
         self.create_widgets()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # µScan decodes in worker processes
     root = tk.Tk()
     app = PfandCalculator(root)
     #root.after(1, run_silent_update) # Run uc on start (1s delay) => updater.py module || UNCOMMENT IN PROD
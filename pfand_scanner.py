@@ -1,27 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
-import cv2
-from PIL import Image, ImageTk
-from pyzbar.pyzbar import decode
-from datetime import datetime, timedelta
+from scanutil.camera import camera_profile
+from scanutil.variants import MultiVariantDecoder
+from scanutil.validate import validation_summary
+from scanutil.scanlog import ScanLog, ScanLogView
+from scanutil.pyramid import PyramidDecoder
+from scanutil.decoders import DecoderBackend
+from scanutil.preview import PreviewRenderer, tile_labels
+from scanutil.multicam import build_scanner
+from scanutil.metrics import ScannerMetrics
+from scanutil.barcode_index import shared_index
+from scanutil.dedup import DedupCache
+from scanutil.classify import PFAND_VALUES, pfand_type as classify_pfand
+from settings import load_settings
+from quantity_journal import shared_journal
+from datetime import datetime
 import threading
 import queue
-import json
-import os
 
 class PfandScanner:
     def __init__(self, window, window_title):
         self.window = window
         self.window.title(window_title)
 
-        self.data_file = "quantities.json"
+        # Scans are journaled, quantities.json is written in batches. The journal and
+        # the quantities dict are shared with the calculator in the same process
+        self.journal = shared_journal()
         self.load_json()
 
-        self.barcode_times = {}
         self.prompted_barcodes = set()
+        self.barcode_index = shared_index()  # Shared with the calculator scanner
 
         self.camera_frame = ttk.Frame(window)
-        self.camera_frame.pack(side="left", padx=10, pady=5)
+        self.camera_frame.pack(side="left", padx=10, pady=5, fill="both", expand=True)
 
         self.control_frame = ttk.Frame(window)
         self.control_frame.pack(side="left", padx=10, pady=5, fill="y")
@@ -29,18 +40,16 @@ class PfandScanner:
         self.info_frame = ttk.Frame(window)
         self.info_frame.pack(side="right", padx=10, pady=5, fill="both", expand=True)
 
-        self.camera_label = ttk.Label(self.camera_frame)
-        self.camera_label.pack()
-
         focus_frame = ttk.LabelFrame(self.control_frame, text="Camera Controls")
         focus_frame.pack(pady=5, padx=5, fill="x")
 
+        profile = camera_profile(0)
         ttk.Label(focus_frame, text="Focus:").pack(pady=2)
         self.focus_slider = ttk.Scale(focus_frame, from_=0, to=255, orient="horizontal")
-        self.focus_slider.set(0)
+        self.focus_slider.set(profile['focus'])
         self.focus_slider.pack(pady=2, padx=5, fill="x")
 
-        self.autofocus_var = tk.BooleanVar(value=True)
+        self.autofocus_var = tk.BooleanVar(value=profile['autofocus'])
         self.autofocus_check = ttk.Checkbutton(
             focus_frame, text="Autofocus", variable=self.autofocus_var, command=self.toggle_autofocus)
         self.autofocus_check.pack(pady=2)
@@ -58,7 +67,21 @@ class PfandScanner:
         self.contrast_slider.set(50)
         self.contrast_slider.pack(pady=2, padx=5, fill="x")
 
-        self.tree = ttk.Treeview(self.info_frame, columns=("Time", "Barcode", "Type", "Deposit"), show="headings")
+        self.status_label = ttk.Label(self.control_frame, text="", wraplength=250)
+        self.status_label.pack(pady=5)
+
+        # FPS, decode time, queue depth and dropped frames on the preview itself
+        self.overlay_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.control_frame, text="Show metrics", variable=self.overlay_var,
+                        command=self.toggle_overlay).pack(pady=2)
+
+        self.settings = load_settings('uscan')
+
+        # Only the newest scans stay in memory, the view only holds the rows on screen
+        self.scan_log = ScanLog(capacity=self.settings['scan_log_rows'])
+        self.log_view = ScanLogView(self.info_frame, self.scan_log, ("Time", "Barcode", "Type", "Deposit"),
+                                    lambda row: (row[0], row[1], row[2], f"{row[3]:.2f}"))
+        self.tree = self.log_view.tree
         self.tree.heading("Time", text="Time")
         self.tree.heading("Barcode", text="Barcode")
         self.tree.heading("Type", text="Type")
@@ -69,84 +92,103 @@ class PfandScanner:
         self.tree.column("Type", width=100)
         self.tree.column("Deposit", width=100)
 
-        self.tree.pack(fill="both", expand=True)
-
-        scrollbar = ttk.Scrollbar(self.info_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-        self.cap.set(cv2.CAP_PROP_FOCUS, 0)
+        self.dedup = DedupCache(self.settings['dedup_cooldown_s'], self.settings['dedup_max_entries'])
+        # pyzbar, OpenCV's detector, or auto: both tried per camera, the better one kept
+        self.backend = DecoderBackend(self.settings['decoder'])
+        # Preprocessing variants are decoded in parallel worker processes, first hit wins
+        self.decoder = MultiVariantDecoder(profile=self.settings['preprocess_profile'], backend=self.backend)
+
+        # Per-stage timings, written to metrics_file for later analysis
+        self.metrics = ScannerMetrics('uscan', self.settings['metrics_file'], self.settings['metrics_interval_s'])
+        self.decoder.preprocessor.metrics = self.metrics
+
+        # Plain decode on a downscaled frame first, the variant pool only gets the likely region
+        self.pyramid = PyramidDecoder(self.backend, self.settings['pyramid_scales'], refine=self.decoder.decode,
+                                      full_fallback=self.settings['pyramid_full_fallback'])
+
+        # One pipeline and preview tile per camera, all of them share the variant pool
+        labels, tile_size = tile_labels(self.camera_frame, len(self.settings['cameras']),
+                                        self.settings['preview_max_size'])
+        self.cameras = build_scanner(
+            self.settings, self.settings['cameras'], self.pyramid.decode, self.backend, self.metrics,
+            lambda index, source: PreviewRenderer(labels[index], tile_size, self.settings['preview_fps'], self.metrics))
+        self.toggle_autofocus()
+        self.focus_slider.configure(command=self.change_focus)
+        self.cameras.start()
 
         self.queue = queue.Queue()
 
-        self.pfand_values = {
-            "EINWEG": 0.25,
-            "MEHRWEG": 0.15,
-            "DOSE": 0.25,
-        }
+        self.pfand_values = PFAND_VALUES
 
         self.process_video()
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.process_queue()
+        self.storage_settings = load_settings('storage')
+        self.window.after(int(self.storage_settings['quantity_flush_interval_s'] * 1000), self.save_json)
 
     def load_json(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                self.quantities = json.load(f)
-        else:
-            self.quantities = {}
+        self.quantities = self.journal.load({})
 
-    def save_json(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.quantities, f, indent=4)
+    def save_json(self, reschedule=True):
+        try:
+            self.journal.flush(self.quantities)
+        except Exception as e:
+            print(f"Error flushing quantities: {e}")
+        if reschedule:
+            self.window.after(int(self.storage_settings['quantity_flush_interval_s'] * 1000), self.save_json)
+
+    def add_quantity(self, product):
+        self.quantities[product] += 1
+        self.journal.record(product, self.quantities[product])
 
     def toggle_autofocus(self):
         if self.autofocus_var.get():
-            self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
+            self.cameras.autofocus = True
             self.focus_slider.state(['disabled'])
         else:
-            self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+            self.cameras.autofocus = False
             self.focus_slider.state(['!disabled'])
-            self.cap.set(cv2.CAP_PROP_FOCUS, self.focus_slider.get())
-
-    def adjust_image(self, frame):
-        brightness = self.brightness_slider.get() / 50.0 - 1.0
-        contrast = self.contrast_slider.get() / 50.0
-        adjusted = cv2.convertScaleAbs(frame, alpha=contrast, beta=brightness * 127)
-        gray = cv2.cvtColor(adjusted, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                       cv2.THRESH_BINARY, 11, 2)
-        return binary
+            self.cameras.focus = self.focus_slider.get()
+
+    def toggle_overlay(self):
+        self.cameras.overlay = self.overlay_var.get()
+
+    def change_focus(self, value):
+        if not self.autofocus_var.get():
+            self.cameras.focus = float(value)
+
+    def adjust_image(self):
+        # Slider values become a lookup table for the adjusted variant, rebuilt only on change
+        self.decoder.preprocessor.set_levels(self.brightness_slider.get(), self.contrast_slider.get())
 
     def process_video(self):
-        ret, frame = self.cap.read()
-        if ret:
-            if not self.autofocus_var.get():
-                self.cap.set(cv2.CAP_PROP_FOCUS, self.focus_slider.get())
-
-            processed_frame = self.adjust_image(frame)
-            barcodes = decode(processed_frame) or decode(frame)
-
-            for barcode in barcodes:
-                points = barcode.polygon
-                if len(points) == 4:
-                    pts = [(p.x, p.y) for p in points]
-                    cv2.polylines(frame, [cv2.convexHull(cv2.UMat(cv2.Mat(pts))).get()], True, (0, 255, 0), 2)
-                barcode_data = barcode.data.decode('utf-8')
-                self.queue.put(barcode_data)
-
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-            img = Image.fromarray(cv2image)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.camera_label.imgtk = imgtk
-            self.camera_label.configure(image=imgtk)
-
-        self.window.after(10, self.process_video)
+        if not self.cameras.running:
+            return
+        self.metrics.polled()
+        delay = 15
+        try:
+            self.adjust_image()
+
+            # Results of all cameras go into one queue, process_queue deduplicates them
+            for tile, frame_id, barcodes in self.cameras.drain():
+                for barcode in barcodes:
+                    barcode_data = barcode.data.decode('utf-8')
+                    self.queue.put(barcode_data)
+
+            if self.cameras.render():
+                self.status_label.configure(text=f"{self.cameras.status_text()}\n{self.pyramid.summary()}\n"
+                                                 f"{validation_summary(self.cameras.validators)}\n"
+                                                 f"Vorverarbeitung: {self.decoder.preprocessor.avg_ms:.1f} ms")
+
+            if self.metrics.export_due():
+                self.metrics.export(self.cameras.stats(), decoders=self.cameras.decoder_stats())
+            delay = self.cameras.poll_interval_ms()
+        except Exception as e:
+            print(f"Error in process_video: {e}")
+            self.metrics.error()
+
+        self.metrics.scheduled(delay)
+        self.window.after(delay, self.process_video)
 
     def show_product_selection(self, barcode_data):
         if hasattr(self, 'product_win') and self.product_win.winfo_exists():
@@ -164,8 +206,8 @@ class PfandScanner:
         def confirm():
             prod = selected_product.get()
             if prod:
-                self.quantities[prod] += 1
-                self.save_json()
+                self.barcode_index.remember(barcode_data, prod, True)
+                self.add_quantity(prod)
                 self.product_win.destroy()
             else:
                 messagebox.showwarning("Keine Auswahl", "Bitte ein Produkt auswählen.")
@@ -173,43 +215,44 @@ class PfandScanner:
         ttk.Button(self.product_win, text="Bestätigen", command=confirm).pack(pady=5)
 
     def process_queue(self):
+        logged = 0
         try:
             while True:
                 barcode_data = self.queue.get_nowait()
-                now = datetime.now()
-
-                if barcode_data in self.barcode_times:
-                    timestamps = self.barcode_times[barcode_data]
-                    timestamps = [t for t in timestamps if now - t <= timedelta(seconds=20)]
-                    if len(timestamps) >= 10:
-                        continue
-                    timestamps.append(now)
-                    self.barcode_times[barcode_data] = timestamps
-                else:
-                    self.barcode_times[barcode_data] = [now]
-
-                current_time = now.strftime("%Y-%m-%d %H:%M:%S")
-                if len(barcode_data) == 13:
-                    pfand_type = "EINWEG"
-                elif len(barcode_data) == 8:
-                    pfand_type = "MEHRWEG"
-                else:
-                    pfand_type = "DOSE"
-                deposit = self.pfand_values.get(pfand_type, 0.00)
-                self.tree.insert("", 0, values=(current_time, barcode_data, pfand_type, f"{deposit:.2f}"))
 
-                if barcode_data not in self.prompted_barcodes:
-                    self.prompted_barcodes.add(barcode_data)
-                    self.window.after(0, self.show_product_selection, barcode_data)
+                # Same barcode still in view (or back within the cooldown), not a new item
+                if not self.dedup.accept(barcode_data):
+                    continue
+
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                pfand_type = classify_pfand(barcode_data)
+                deposit = self.pfand_values.get(pfand_type, 0.00)
+                self.scan_log.append((current_time, barcode_data, pfand_type, deposit))
+                logged += 1
+
+                entry = self.barcode_index.get(barcode_data)
+                if entry is None:
+                    if barcode_data not in self.prompted_barcodes:
+                        self.prompted_barcodes.add(barcode_data)
+                        self.window.after(0, self.show_product_selection, barcode_data)
+                elif entry['has_pfand'] and entry['product'] in self.quantities:
+                    # Known barcode, counted without asking
+                    self.add_quantity(entry['product'])
 
         except queue.Empty:
             pass
         finally:
+            if logged:
+                self.log_view.appended(logged)
             self.window.after(100, self.process_queue)
 
     def on_closing(self):
-        if self.cap.isOpened():
-            self.cap.release()
+        self.cameras.stop()
+        if self.metrics.path:
+            self.metrics.export(self.cameras.stats(), decoders=self.cameras.decoder_stats())
+        self.decoder.close()
+        self.save_json(reschedule=False)
+        self.scan_log.close()
         self.window.destroy()
 
 if __name__ != "__main__":
@@ -0,0 +1,83 @@
+import json
+import os
+
+QUANTITIES_FILE = 'quantities.json'
+JOURNAL_FILE = 'quantities.journal'
+
+class QuantityJournal:
+    # Write-behind storage for quantities: every change is one appended line,
+    # quantities.json is only rewritten when flush() runs (timer, manual save, exit).
+    # Lines hold the new absolute value, so replaying them twice does no harm.
+    # There must be only one journal per file in a process (see shared_journal), it
+    # owns the quantities dict that the calculator and µScan both count into.
+    def __init__(self, path=QUANTITIES_FILE, journal_path=JOURNAL_FILE):
+        self.path = path
+        self.journal_path = journal_path
+        self.pending = 0
+        self.quantities = None
+        self._journal = None
+
+    def load(self, defaults):
+        # Read once, later callers get the same dict with their defaults added
+        if self.quantities is None:
+            self.quantities = self._read(defaults)
+        for product, value in defaults.items():
+            self.quantities.setdefault(product, value)
+        return self.quantities
+
+    def _read(self, defaults):
+        try:
+            with open(self.path, 'r') as f:
+                quantities = json.load(f)
+        except FileNotFoundError:
+            quantities = dict(defaults)
+
+        # Changes that were not flushed before the last exit
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Cut off line from a crash, everything after it is lost anyway
+                    quantities[entry['product']] = entry['value']
+                    self.pending += 1
+        except FileNotFoundError:
+            pass
+        return quantities
+
+    def record(self, product, value):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({'product': product, 'value': value}) + '\n')
+        self._journal.flush()
+        self.pending += 1
+
+    def flush(self, quantities, force=False):
+        if not self.pending and not force:
+            return False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(quantities, f)
+        os.replace(tmp_path, self.path)
+        self.discard()
+        return True
+
+    def discard(self):
+        # Drops the journal, e.g. after a flush or when the save file is deleted
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.pending = 0
+
+_shared = None
+
+def shared_journal():
+    # Both scanners in this process count into the same journal and dict, a second
+    # journal would flush a stale dict and delete the other one's unflushed lines
+    global _shared
+    if _shared is None:
+        _shared = QuantityJournal()
+    return _shared
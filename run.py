@@ -1,6 +1,7 @@
 import tkinter as tk
 import platform
 import os
+import multiprocessing
 from main import PfandCalculator
 
 def setup_platform_specific():
@@ -16,6 +17,7 @@ def setup_platform_specific():
             os.environ['PYTHONW_RUNNING'] = '1'
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # µScan decodes in worker processes
     setup_platform_specific()
     root = tk.Tk()
     app = PfandCalculator(root)
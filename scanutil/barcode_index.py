@@ -0,0 +1,53 @@
+import json
+import os
+
+INDEX_FILE = 'barcode_index.json'
+
+class BarcodeIndex:
+    # Remembers which product a barcode belongs to and whether it has Pfand,
+    # so known bottles are counted without asking again
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            print(f"Error reading {self.path}: {e}")
+            return {}
+
+    def save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+        except Exception as e:
+            print(f"Error saving {self.path}: {e}")
+
+    def get(self, barcode):
+        return self.entries.get(barcode)
+
+    def remember(self, barcode, product, has_pfand):
+        self.entries[barcode] = {'product': product, 'has_pfand': has_pfand}
+        self.save()
+
+    def forget(self, barcode):
+        if self.entries.pop(barcode, None) is not None:
+            self.save()
+
+    def clear(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+_shared = None
+
+def shared_index():
+    # Loaded once, both scanners in this process use the same instance
+    global _shared
+    if _shared is None:
+        _shared = BarcodeIndex()
+    return _shared
@@ -0,0 +1,151 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from scanutil.classify import PFAND_VALUES, pfand_type
+from scanutil.decoders import DecoderBackend
+from scanutil.preprocess import Preprocessor
+from scanutil.pyramid import PyramidDecoder
+from scanutil.session import ReplayCapture, is_session
+from settings import load_settings
+
+# Headless scanning of a recorded video or a folder of photos:
+#   python -m scanutil.batch aufnahme.mp4 -o barcodes.csv
+#   python -m scanutil.batch fotos/ -o barcodes.jsonl
+#   python -m scanutil.batch scan_20240101_120000.pfsession -o barcodes.csv
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+_decoder = None
+
+def _init_worker(settings):
+    global _decoder
+    preprocessor = Preprocessor(settings['preprocess_profile'])
+    pyramid = PyramidDecoder(DecoderBackend(settings['decoder']), settings['pyramid_scales'],
+                             full_fallback=settings['pyramid_full_fallback'])
+    _decoder = (preprocessor, pyramid)
+
+def _decode_item(item):
+    # Runs in a worker process, item is a gray frame or the path of a photo
+    preprocessor, pyramid = _decoder
+    if isinstance(item, str):
+        item = cv2.imread(item, cv2.IMREAD_GRAYSCALE)
+        if item is None:
+            return []
+    barcodes = pyramid.decode(preprocessor.apply(item))
+    return sorted({barcode.data.decode('utf-8') for barcode in barcodes})
+
+def iter_video(path, every=1):
+    # Recorded scanner sessions are read at full speed, without the recorded timing
+    cap = ReplayCapture(path, realtime=False) if is_session(path) else cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Video konnte nicht geöffnet werden: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                timestamp = index / fps if fps else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                yield index, timestamp, None, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            index += 1
+    finally:
+        cap.release()
+
+def iter_images(folder):
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))
+    for index, name in enumerate(names):
+        yield index, None, name, os.path.join(folder, name)
+
+def scan(source, settings, workers=None, cooldown=2.0):
+    # Yields one row per detection, in frame order. In videos the same barcode
+    # is only counted again after it was out of sight for `cooldown` seconds
+    last_seen = {}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as pool:
+        pending = deque()
+
+        def finish(entry):
+            index, timestamp, name, future = entry
+            for barcode_data in future.result():
+                if timestamp is not None:
+                    previous = last_seen.get(barcode_data)
+                    last_seen[barcode_data] = timestamp
+                    if previous is not None and timestamp - previous <= cooldown:
+                        continue
+                yield {
+                    'frame': index,
+                    'timestamp': None if timestamp is None else round(timestamp, 3),
+                    'file': name,
+                    'barcode': barcode_data,
+                    'pfand_type': pfand_type(barcode_data),
+                }
+
+        for index, timestamp, name, item in source:
+            pending.append((index, timestamp, name, pool.submit(_decode_item, item)))
+            # Keep a bounded number of frames in flight, results stay in order
+            if len(pending) >= workers * 2:
+                yield from finish(pending.popleft())
+        while pending:
+            yield from finish(pending.popleft())
+
+def write_rows(rows, output):
+    if output.lower().endswith('.jsonl'):
+        with open(output, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+                yield row
+        return
+
+    with open(output, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(['Frame', 'Zeit (s)', 'Datei', 'Barcode', 'Pfand Typ'])
+        for row in rows:
+            writer.writerow([
+                row['frame'],
+                '' if row['timestamp'] is None else f"{row['timestamp']:.3f}",
+                row['file'] or '',
+                row['barcode'],
+                row['pfand_type'],
+            ])
+            yield row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barcodes aus einem Video oder Bilderordner auslesen")
+    parser.add_argument('input', help="Videodatei, Scanner Aufnahme (.pfsession) oder Ordner mit Fotos")
+    parser.add_argument('-o', '--output', default='barcodes.csv', help="Ausgabe als .csv oder .jsonl")
+    parser.add_argument('--workers', type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument('--every', type=int, default=None, help="Nur jeden n-ten Videoframe dekodieren")
+    parser.add_argument('--cooldown', type=float, default=None,
+                        help="Sekunden, bevor derselbe Barcode im Video erneut gezählt wird")
+    args = parser.parse_args(argv)
+
+    settings = load_settings('batch')
+    every = args.every or settings['every']
+    cooldown = settings['cooldown_s'] if args.cooldown is None else args.cooldown
+
+    if os.path.isdir(args.input):
+        source = iter_images(args.input)
+    else:
+        source = iter_video(args.input, every)
+
+    counts = {}
+    for row in write_rows(scan(source, settings, args.workers, cooldown), args.output):
+        counts[row['pfand_type']] = counts.get(row['pfand_type'], 0) + 1
+
+    total = sum(PFAND_VALUES.get(kind, 0.0) * count for kind, count in counts.items())
+    for kind, count in sorted(counts.items()):
+        print(f"{kind}: {count}")
+    print(f"Gesamt: {sum(counts.values())} Barcodes, €{total:.2f} -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
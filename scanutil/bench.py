@@ -0,0 +1,184 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from scanutil.decoders import MODES, DecoderBackend
+from scanutil.preprocess import Preprocessor
+from scanutil.pyramid import PyramidDecoder
+from scanutil.validate import check_digit
+from scanutil.variants import MultiVariantDecoder
+from settings import load_settings
+
+# Renders synthetic EAN-13/EAN-8 frames and runs them through the decode paths of
+# both scanners, e.g. python -m scanutil.bench --frames 300 -o bench.json
+
+FRAME_SIZE = (1280, 720)
+
+L_CODES = ["0001101", "0011001", "0010011", "0111101", "0100011",
+           "0110001", "0101111", "0111011", "0110111", "0001011"]
+G_CODES = [code.translate(str.maketrans("01", "10"))[::-1] for code in L_CODES]
+R_CODES = [code.translate(str.maketrans("01", "10")) for code in L_CODES]
+PARITY = ["LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+          "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL"]
+
+CONDITIONS = {
+    "scale": [2, 3, 4],            # pixels per module
+    "rotation": [0, 10, 30, 90],   # degrees
+    "blur": [0.0, 1.0, 2.5],       # gaussian sigma
+    "noise": [0, 8, 20],           # gaussian noise stddev
+    "lighting": ["dark", "normal", "bright", "gradient"],
+}
+
+def ean_modules(digits):
+    # digits without check digit: 12 for EAN-13, 7 for EAN-8
+    code = digits + check_digit(digits)
+    if len(code) == 13:
+        parity = PARITY[int(code[0])]
+        left = "".join((L_CODES if parity[i] == "L" else G_CODES)[int(d)] for i, d in enumerate(code[1:7]))
+        right = "".join(R_CODES[int(d)] for d in code[7:])
+    else:
+        left = "".join(L_CODES[int(d)] for d in code[:4])
+        right = "".join(R_CODES[int(d)] for d in code[4:])
+    return code, "101" + left + "01010" + right + "101"
+
+def render_frame(modules, scale, rotation, blur, noise, lighting, rng):
+    bars = np.array([0 if m == "1" else 255 for m in modules], dtype=np.uint8)
+    bars = np.pad(bars, 10, constant_values=255)  # quiet zone
+    symbol = np.tile(np.repeat(bars, scale), (int(len(bars) * scale * 0.45), 1))
+
+    width, height = FRAME_SIZE
+    frame = np.full((height, width), 170, dtype=np.uint8)
+    h, w = symbol.shape
+    x = int(rng.integers(0, max(1, width - w)))
+    y = int(rng.integers(0, max(1, height - h)))
+    frame[y:y + h, x:x + w] = symbol[:height - y, :width - x]
+
+    if rotation:
+        matrix = cv2.getRotationMatrix2D((x + w / 2, y + h / 2), rotation, 1.0)
+        frame = cv2.warpAffine(frame, matrix, (width, height), borderValue=170)
+    if blur:
+        frame = cv2.GaussianBlur(frame, (0, 0), blur)
+
+    image = frame.astype(np.float32)
+    if lighting == "dark":
+        image = image * 0.35
+    elif lighting == "bright":
+        image = image * 0.6 + 110
+    elif lighting == "gradient":
+        image = image * np.linspace(0.3, 1.1, width, dtype=np.float32)[None, :]
+    if noise:
+        image = image + rng.normal(0, noise, image.shape).astype(np.float32)
+    gray = np.clip(image, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+def generate_cases(count, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        symbology = "EAN13" if rng.random() < 0.6 else "EAN8"
+        digits = "".join(str(d) for d in rng.integers(0, 10, 12 if symbology == "EAN13" else 7))
+        condition = {name: values[int(rng.integers(len(values)))] for name, values in CONDITIONS.items()}
+        code, modules = ean_modules(digits)
+        frame = render_frame(modules, rng=rng, **condition)
+        yield symbology, code, condition, frame
+
+def scanner_path(settings):
+    # Same chain as PfandCalculator.detect_barcodes
+    preprocessor = Preprocessor(settings['preprocess_profile'])
+    decoder = DecoderBackend(settings['decoder'])
+    pyramid = PyramidDecoder(decoder, settings['pyramid_scales'], full_fallback=settings['pyramid_full_fallback'])
+    return lambda frame: pyramid.decode(preprocessor.apply(frame)), decoder, lambda: None
+
+def uscan_path(settings):
+    # Same chain as PfandScanner: pyramid with the variant pool as full resolution step
+    backend = DecoderBackend(settings['decoder'])
+    decoder = MultiVariantDecoder(profile=settings['preprocess_profile'], backend=backend)
+    pyramid = PyramidDecoder(backend, settings['pyramid_scales'], refine=decoder.decode,
+                             full_fallback=settings['pyramid_full_fallback'])
+    return pyramid.decode, backend, decoder.close
+
+PATHS = {
+    "scanner": scanner_path,
+    "uscan": uscan_path,
+}
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def summarize(latencies, hits):
+    total_s = sum(latencies) / 1000
+    return {
+        "frames": len(latencies),
+        "fps": round(len(latencies) / total_s, 2) if total_s else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "detection_rate": round(sum(hits) / len(hits), 4) if hits else 0.0,
+    }
+
+def run_path(name, cases, decoder=None):
+    # Frame rendering is not part of the measured time
+    settings = load_settings(name)
+    if decoder:
+        settings['decoder'] = decoder
+    decode_frame, backend, close = PATHS[name](settings)
+    latencies, hits = [], []
+    by_condition = {}
+    try:
+        for symbology, code, condition, frame in cases:
+            started = time.perf_counter()
+            barcodes = decode_frame(frame)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            hit = any(barcode.data.decode('utf-8') == code for barcode in barcodes)
+            latencies.append(elapsed_ms)
+            hits.append(hit)
+            for key, value in [("symbology", symbology)] + list(condition.items()):
+                bucket = by_condition.setdefault(key, {}).setdefault(str(value), ([], []))
+                bucket[0].append(elapsed_ms)
+                bucket[1].append(hit)
+    finally:
+        close()
+
+    result = summarize(latencies, hits)
+    result["decoder"] = backend.mode
+    result["backends"] = backend.export()
+    result["by_condition"] = {
+        key: {value: summarize(*bucket) for value, bucket in buckets.items()}
+        for key, buckets in by_condition.items()
+    }
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scanner Benchmark mit synthetischen Barcodes")
+    parser.add_argument('--frames', type=int, default=200, help="Anzahl synthetischer Frames")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--paths', nargs='+', choices=sorted(PATHS), default=sorted(PATHS))
+    parser.add_argument('--decoder', choices=MODES, default=None,
+                        help="Decoder für alle Pfade (Standard: aus settings.json)")
+    parser.add_argument('-o', '--output', help="JSON Datei (Standard: stdout)")
+    args = parser.parse_args(argv)
+
+    # Every path sees exactly the same frames, rendered again from the seed
+    report = {
+        "frames": args.frames,
+        "seed": args.seed,
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+        "opencv": cv2.__version__,
+        "paths": {name: run_path(name, generate_cases(args.frames, args.seed), args.decoder)
+                  for name in args.paths},
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import math
+
+class AdaptiveCadence:
+    # Decides how often a captured frame is decoded, based on measured decode time,
+    # capture rate and how long frames wait before the worker picks them up. Decoding
+    # fewer frames only shortens the wait, not the decode itself, so only the wait
+    # (latency - decode time) is held under target_latency_ms
+    def __init__(self, target_latency_ms=150, max_every=10, smoothing=0.2):
+        self.target_latency_ms = target_latency_ms
+        self.max_every = max_every
+        self.smoothing = smoothing
+        self.every = 1
+        self.decode_ms = 0.0
+        self.latency_ms = 0.0
+        self.queue_ms = 0.0
+        self.backlog = 0
+
+    def should_decode(self, frame_id):
+        return frame_id % self.every == 0
+
+    def _smooth(self, current, sample):
+        return sample if not current else current + (sample - current) * self.smoothing
+
+    def record_decode(self, decode_s, latency_s, capture_fps, backlog):
+        self.decode_ms = self._smooth(self.decode_ms, decode_s * 1000)
+        self.latency_ms = self._smooth(self.latency_ms, latency_s * 1000)
+        self.queue_ms = self._smooth(self.queue_ms, max(0.0, latency_s - decode_s) * 1000)
+        self.backlog = backlog
+
+        if self.queue_ms > self.target_latency_ms:
+            self.every += 1
+        elif self.queue_ms < self.target_latency_ms * 0.5:
+            self.every -= 1
+
+        # Never hand the worker more frames than it can finish
+        floor = math.ceil(self.decode_ms * capture_fps / 1000) if capture_fps else 1
+        self.every = max(1, min(self.max_every, max(self.every, floor)))
+
+    def poll_interval_ms(self, capture_fps):
+        # Tk polls about twice per captured frame
+        if not capture_fps:
+            return 15
+        return int(max(5, min(50, 500 / capture_fps)))
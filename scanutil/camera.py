@@ -0,0 +1,342 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+
+FRAME_SIZE = (1280, 720)
+PROFILES_FILE = 'camera_profiles.json'
+SESSION_SUFFIX = '.pfsession'  # Recorded sessions, see scanutil.session
+
+# Applied once when a device is opened, None leaves the driver default alone
+DEFAULT_PROFILE = {
+    'width': FRAME_SIZE[0],
+    'height': FRAME_SIZE[1],
+    'fps': 30,
+    'fourcc': None,  # e.g. "MJPG", many USB cameras only reach 30 FPS at 720p with it
+    'buffersize': 1,  # Minimize buffer delay
+    'autofocus': True,
+    'focus': 0,
+    'exposure': None,
+}
+
+# Format of the stream, only sent when the device is opened. FOURCC has to be set
+# before the resolution or some drivers ignore it
+FORMAT = {
+    'fourcc': cv2.CAP_PROP_FOURCC,
+    'width': cv2.CAP_PROP_FRAME_WIDTH,
+    'height': cv2.CAP_PROP_FRAME_HEIGHT,
+    'fps': cv2.CAP_PROP_FPS,
+    'buffersize': cv2.CAP_PROP_BUFFERSIZE,
+}
+
+# Properties that can change while the camera runs, in the order they are sent
+CONTROLS = {
+    'autofocus': cv2.CAP_PROP_AUTOFOCUS,
+    'focus': cv2.CAP_PROP_FOCUS,
+    'exposure': cv2.CAP_PROP_EXPOSURE,
+}
+
+PROPERTIES = dict(FORMAT, **CONTROLS)
+
+def fourcc_text(value):
+    code = int(value)
+    return ''.join(chr((code >> shift) & 0xFF) for shift in (0, 8, 16, 24)) if code > 0 else None
+
+def device_name(index):
+    # Name of a camera index that stays the same when cameras are re-plugged and
+    # their indices change, None when the platform does not tell
+    if sys.platform.startswith('linux'):
+        # by-id links contain vendor, model and serial number
+        node = f'/dev/video{index}'
+        for link in sorted(glob.glob('/dev/v4l/by-id/*')):
+            if os.path.realpath(link) == node:
+                return os.path.basename(link)
+        try:
+            with open(f'/sys/class/video4linux/video{index}/name', 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    if sys.platform == 'win32':
+        # DirectShow lists the devices in the order OpenCV numbers them
+        try:
+            from pygrabber.dshow_graph import FilterGraph
+            names = FilterGraph().get_input_devices()
+        except Exception:
+            return None
+        if index >= len(names):
+            return None
+        # Two cameras of the same model are told apart by their order
+        same = names[:index].count(names[index])
+        return names[index] + (f" #{same + 1}" if same else "")
+    return None
+
+def profile_key(source):
+    # Profiles of real cameras are stored under their device name, files and
+    # sessions under their path
+    if isinstance(source, int):
+        return device_name(source) or str(source)
+    return str(source)
+
+def load_camera_profiles(path=PROFILES_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"Error reading {path}: {e}")
+        return {}
+
+def camera_profile(source, path=PROFILES_FILE):
+    profiles = load_camera_profiles(path)
+    profile = dict(DEFAULT_PROFILE)
+    # Older profiles are stored under the bare index, used until the named one is saved
+    profile.update(profiles.get(profile_key(source)) or profiles.get(str(source), {}))
+    return profile
+
+def save_camera_profile(source, profile, path=PROFILES_FILE):
+    profiles = load_camera_profiles(path)
+    key = profile_key(source)
+    if key != str(source):
+        profiles.pop(str(source), None)
+    profiles[key] = profile
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profiles, f, indent=2)
+    except Exception as e:
+        print(f"Error saving {path}: {e}")
+
+def open_source(source, realtime=True):
+    # A recorded session replays through the same device code as a real camera,
+    # realtime=False plays it as fast as the subscribers take the frames. The
+    # profile of a camera is sent by its CameraControls
+    if isinstance(source, str) and source.lower().endswith(SESSION_SUFFIX):
+        from scanutil.session import ReplayCapture
+        return ReplayCapture(source, realtime)
+    return cv2.VideoCapture(source)
+
+class CameraControls:
+    # The Tk thread only requests values. The capture thread sends a property to
+    # the driver when its value really changed and reads back what was accepted
+    def __init__(self, profile):
+        self.current = {name: profile[name] for name in PROPERTIES}
+        self.accepted = {}  # What the driver reports after each property was sent
+        self.unsupported = set()
+        self._requested = {}
+        self._lock = threading.Lock()
+
+    def request(self, name, value):
+        with self._lock:
+            self._requested[name] = value
+
+    def open(self, cap):
+        # Format and controls from the profile once, afterwards only control changes
+        for name in PROPERTIES:
+            self._send(cap, name, self.current[name])
+
+    def apply(self, cap):
+        if not self._requested:
+            return
+        with self._lock:
+            requested, self._requested = self._requested, {}
+        for name in CONTROLS:
+            if name in requested and requested[name] != self.current[name]:
+                self._send(cap, name, requested[name])
+                if name == 'autofocus' and not requested[name]:
+                    # Manual focus was not sent while autofocus was on
+                    self._send(cap, 'focus', requested.pop('focus', self.current['focus']))
+
+    def _send(self, cap, name, value):
+        self.current[name] = value
+        if value is None:
+            self.accepted[name] = self._read(cap, name)  # Driver default
+            return
+        if name == 'focus' and self.current['autofocus']:
+            return  # The driver ignores manual focus while autofocus is on
+        if name == 'autofocus':
+            value = 1 if value else 0
+        if name == 'fourcc':
+            cap.set(PROPERTIES[name], cv2.VideoWriter_fourcc(*value))
+        else:
+            cap.set(PROPERTIES[name], value)
+        accepted = self._read(cap, name)
+        self.accepted[name] = accepted
+        if name == 'fourcc':
+            rejected = accepted != value
+        else:
+            rejected = abs(accepted - value) > 0.5
+        if rejected and name not in self.unsupported:
+            self.unsupported.add(name)
+            print(f"Camera did not accept {name}={value} (reports {accepted})")
+
+    def _read(self, cap, name):
+        value = cap.get(PROPERTIES[name])
+        return fourcc_text(value) if name == 'fourcc' else value
+
+class FramePool:
+    # Recycles frame buffers so the capture loop does not allocate per frame
+    def __init__(self, shape, max_free=8):
+        self.shape = shape
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            image = self._free.pop() if self._free else None
+        if image is None:
+            return np.empty(self.shape, dtype=np.uint8)
+        image.flags.writeable = True
+        return image
+
+    def give_back(self, image):
+        if image.shape != self.shape:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(image)
+
+class Frame:
+    # One captured frame shared by all subscribers without copying. The image is
+    # read-only, every holder calls retain() to keep it and release() when done,
+    # the buffer goes back to the pool after the last release
+    def __init__(self, image, frame_id, timestamp, pool, read_ms=0.0):
+        image.flags.writeable = False
+        self.image = image
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.read_ms = read_ms  # Time spent in cap.read() and the resize
+        self._pool = pool
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def retain(self):
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            last = self._refs == 0
+        if last:
+            self._pool.give_back(self.image)
+
+class CameraDevice:
+    # Owns one VideoCapture and feeds every frame to the subscribers
+    def __init__(self, source, open_capture=open_source, realtime=True):
+        self.source = source
+        self.open_capture = open_capture
+        self.realtime = realtime
+        self.profile = camera_profile(source)
+        self.controls = CameraControls(self.profile)
+        self.pool = FramePool((FRAME_SIZE[1], FRAME_SIZE[0], 3))
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+        self.running = False
+        self._thread = None
+
+    def add(self, callback):
+        with self._lock:
+            self.subscribers.append(callback)
+
+    def remove(self, callback):
+        with self._lock:
+            self.subscribers.remove(callback)
+            return len(self.subscribers)
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _capture_loop(self):
+        cap = self.open_capture(self.source, self.realtime)
+        virtual = getattr(cap, 'virtual', False)
+        frame_id = 0
+        try:
+            if not virtual:
+                self.controls.open(cap)
+            while self.running:
+                if not virtual:
+                    self.controls.apply(cap)
+                buffer = self.pool.take()
+                started = time.perf_counter()
+                ret, image = cap.read(buffer)
+                if not ret:
+                    self.pool.give_back(buffer)
+                    time.sleep(0.01)
+                    continue
+
+                # Resize frame for faster processing (720p is plenty for barcode detection)
+                if image.shape != buffer.shape:
+                    image = cv2.resize(image, FRAME_SIZE, dst=buffer)
+
+                frame_id += 1
+                now = time.perf_counter()
+                frame = Frame(image, frame_id, now, self.pool, (now - started) * 1000)
+                with self._lock:
+                    subscribers = list(self.subscribers)
+                for callback in subscribers:
+                    try:
+                        callback(frame)
+                    except Exception as e:
+                        print(f"Error in camera subscriber: {e}")
+                frame.release()
+        except Exception as e:
+            print(f"Error in capture thread: {e}")
+        finally:
+            cap.release()
+            self.save_profile()
+
+    def save_profile(self):
+        # Focus settings are remembered per device (by name, see profile_key) for the next start
+        profile = dict(self.profile, **self.controls.current)
+        if self.controls.accepted:
+            # For reference, what the driver made of the requested values last time
+            profile['accepted'] = dict(self.controls.accepted)
+        if profile != self.profile:
+            self.profile = profile
+            save_camera_profile(self.source, profile)
+
+class CameraBroker:
+    # Opens every device once, no matter how many scanners want frames from it,
+    # and releases it again when the last subscriber leaves
+    def __init__(self):
+        self.devices = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, source, callback, realtime=True):
+        # `realtime` only counts for the first subscriber, it opens the device
+        with self._lock:
+            device = self.devices.get(source)
+            if device is None:
+                device = CameraDevice(source, realtime=realtime)
+                self.devices[source] = device
+                device.add(callback)
+                device.start()
+            else:
+                device.add(callback)
+        return device
+
+    def unsubscribe(self, source, callback):
+        with self._lock:
+            device = self.devices.get(source)
+            if device is None:
+                return
+            if device.remove(callback) == 0:
+                del self.devices[source]
+                device.stop()
+
+broker = CameraBroker()
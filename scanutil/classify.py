@@ -0,0 +1,12 @@
+PFAND_VALUES = {
+    "EINWEG": 0.25,
+    "MEHRWEG": 0.15,
+    "DOSE": 0.25,
+}
+
+def pfand_type(barcode_data):
+    if len(barcode_data) == 13:
+        return "EINWEG"
+    if len(barcode_data) == 8:
+        return "MEHRWEG"
+    return "DOSE"
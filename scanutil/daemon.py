@@ -0,0 +1,208 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scanutil.classify import pfand_type
+from scanutil.decoders import DecoderBackend
+from scanutil.dedup import DedupCache
+from scanutil.metrics import ScannerMetrics
+from scanutil.multicam import build_scanner
+from scanutil.preprocess import Preprocessor
+from scanutil.pyramid import PyramidDecoder
+from settings import load_settings
+
+# Scanner without a GUI, confirmed scans are published as JSON lines:
+#   python -m scanutil.daemon --port 8765
+#   curl -N http://127.0.0.1:8765/events
+# GET /status returns the pipeline status of every camera
+
+class EventHub:
+    # Every connected client gets its own bounded queue, a client that does not
+    # read fast enough loses its oldest events instead of blocking the scanner
+    def __init__(self, max_pending=256):
+        self.max_pending = max_pending
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        client = queue.Queue(self.max_pending)
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.remove(client)
+
+    def publish(self, event):
+        line = (json.dumps(event) + '\n').encode('utf-8')
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            while True:
+                try:
+                    client.put_nowait(line)
+                    break
+                except queue.Full:
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        pass
+
+def headless_scanner(settings, sources, metrics=None):
+    # Same decode chain as the scanner window, one pipeline per camera, no previews
+    preprocessor = Preprocessor(settings['preprocess_profile'])
+    preprocessor.metrics = metrics
+    decoder = DecoderBackend(settings['decoder'])
+    pyramid = PyramidDecoder(decoder, settings['pyramid_scales'], full_fallback=settings['pyramid_full_fallback'])
+    return build_scanner(settings, sources, lambda frame: pyramid.decode(preprocessor.apply(frame)),
+                         decoder, metrics)
+
+def make_handler(hub, scanner, heartbeat_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path == '/events':
+                self.stream_events()
+            elif self.path == '/status':
+                body = json.dumps({'status': scanner.status_text()}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_error(404)
+
+        def stream_events(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Cache-Control', 'no-cache')
+            # One chunk per event, so clients get every line as soon as it is written
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            client = hub.subscribe()
+            try:
+                while True:
+                    try:
+                        line = client.get(timeout=heartbeat_s)
+                    except queue.Empty:
+                        # Lets both sides notice a dead connection
+                        line = b'{"type": "heartbeat"}\n'
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                    self.wfile.flush()
+            except OSError:
+                pass  # Client gone (reset, aborted on Windows, broken pipe)
+            finally:
+                hub.unsubscribe(client)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def run(scanner, hub, dedup, stop_event=None, metrics=None):
+    # Drains every camera, publishes each barcode once per sighting
+    scanner.start()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            for tile, frame_id, barcodes in scanner.drain():
+                for barcode in barcodes:
+                    barcode_data = barcode.data.decode('utf-8')
+                    if not dedup.accept(barcode_data):
+                        continue
+                    hub.publish({
+                        'type': 'scan',
+                        'barcode': barcode_data,
+                        'pfand_type': pfand_type(barcode_data),
+                        'camera': tile.source,
+                        'timestamp': datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+                    })
+            if metrics is not None and metrics.export_due():
+                metrics.export(scanner.stats(), decoders=scanner.decoder_stats())
+            time.sleep(scanner.poll_interval_ms() / 1000)
+    finally:
+        scanner.stop()
+        if metrics is not None and metrics.path:
+            metrics.export(scanner.stats(), decoders=scanner.decoder_stats())
+
+class EventClient:
+    # Reads the event stream of a daemon in a background thread. Events end up in
+    # `events`, the Tk thread polls it. Reconnects after `retry_s` if the daemon is gone
+    def __init__(self, url, retry_s=2.0, timeout_s=15.0):
+        self.url = url
+        self.retry_s = retry_s
+        self.timeout_s = timeout_s
+        self.events = queue.Queue()
+        self.connected = False
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _read_loop(self):
+        # Only the client needs requests, the daemon itself runs without it
+        import requests
+        while self.running:
+            try:
+                with requests.get(self.url, stream=True, timeout=(3, self.timeout_s)) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    for line in response.iter_lines(chunk_size=None):
+                        if not self.running:
+                            break
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event.get('type') != 'heartbeat':
+                            self.events.put(event)
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                if self.running:
+                    print(f"Error reading scanner events: {e}")
+            finally:
+                self.connected = False
+            if self.running:
+                time.sleep(self.retry_s)
+
+def main(argv=None):
+    settings = load_settings('daemon')
+    scanner_settings = load_settings('scanner')
+    parser = argparse.ArgumentParser(description="Pfand Scanner ohne Oberfläche, Ereignisse als JSON Zeilen über HTTP")
+    parser.add_argument('--host', default=settings['host'])
+    parser.add_argument('--port', type=int, default=settings['port'])
+    parser.add_argument('--cameras', nargs='+', default=None,
+                        help="Kamera Indizes oder .pfsession Dateien (Standard: aus settings.json)")
+    args = parser.parse_args(argv)
+
+    sources = [int(source) if source.isdigit() else source for source in args.cameras] if args.cameras \
+        else scanner_settings['cameras']
+    metrics = ScannerMetrics('daemon', scanner_settings['metrics_file'], scanner_settings['metrics_interval_s'])
+    scanner = headless_scanner(scanner_settings, sources, metrics)
+    hub = EventHub()
+    dedup = DedupCache(scanner_settings['dedup_cooldown_s'], scanner_settings['dedup_max_entries'])
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(hub, scanner, settings['heartbeat_s']))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Scanner läuft: http://{args.host}:{args.port}/events ({len(sources)} Kamera(s))")
+    try:
+        run(scanner, hub, dedup, metrics=metrics)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import threading
+import time
+import weakref
+import cv2
+from pyzbar.pyzbar import Decoded, decode as zbar_decode
+from pyzbar.locations import Point, Rect
+
+# Decoder backends, all return pyzbar style results (data, type, rect, polygon)
+#   pyzbar: libzbar, the default
+#   opencv: cv2.barcode.BarcodeDetector (OpenCV 4.8+ or opencv-contrib)
+#   auto:   tries both on the first frames of a camera and keeps the better one
+BACKENDS = ("pyzbar", "opencv")
+MODES = BACKENDS + ("auto",)
+
+def opencv_available():
+    return hasattr(cv2, 'barcode') and hasattr(cv2.barcode, 'BarcodeDetector')
+
+def make_result(data, symbology, points):
+    polygon = [Point(int(x), int(y)) for x, y in points]
+    xs = [p.x for p in polygon]
+    ys = [p.y for p in polygon]
+    rect = Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+    # Newer pyzbar versions have quality and orientation as well
+    values = {'data': data, 'type': symbology, 'rect': rect, 'polygon': polygon, 'quality': 1}
+    return Decoded(*(values.get(field) for field in Decoded._fields))
+
+class OpenCvBackend:
+    # One detector per thread, every camera decodes in its own worker thread
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, image):
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = cv2.barcode.BarcodeDetector()
+        ok, infos, types, points = detector.detectAndDecodeWithType(image)
+        if not ok or points is None:
+            return []
+        # EAN_13 -> EAN13, the names pyzbar uses
+        return [make_result(info.encode('utf-8'), symbology.replace('_', ''), corners)
+                for info, symbology, corners in zip(infos, types, points) if info]
+
+_backends = {}
+
+def backend(name):
+    # Shared instances, also used by the variant worker processes
+    if name not in _backends:
+        _backends[name] = OpenCvBackend() if name == "opencv" else zbar_decode
+    return _backends[name]
+
+def decode_with(name, image):
+    return backend(name)(image)
+
+class BackendStats:
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.calls = 0
+        self.hits = 0
+        self.avg_ms = 0.0
+
+    def record(self, elapsed_ms, hit):
+        self.calls += 1
+        self.hits += bool(hit)
+        self.avg_ms += (elapsed_ms - self.avg_ms) * self.smoothing if self.avg_ms else elapsed_ms
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.calls if self.calls else 0.0
+
+class ThreadChoice:
+    # Backend of one decode thread, and its trial results (hits, seconds) per backend
+    def __init__(self, trial):
+        self.reset(trial)
+
+    def reset(self, trial):
+        self.backend = None
+        self.left = trial
+        self.results = {name: [0, 0.0] for name in BACKENDS}
+
+class DecoderBackend:
+    # Callable like pyzbar's decode. In auto mode every decode thread (= camera) runs
+    # both backends on its next `trial` frames, then keeps the one with more hits, or
+    # the faster one if both found the same. After `retrial_every` decodes the trial
+    # is repeated, lighting and distance change over a day
+    def __init__(self, mode="pyzbar", trial=30, retrial_every=1000):
+        if mode not in MODES:
+            print(f"Unknown decoder '{mode}', using 'pyzbar'")
+            mode = "pyzbar"
+        if mode != "pyzbar" and not opencv_available():
+            print(f"Decoder '{mode}' needs cv2.barcode (OpenCV 4.8+), using 'pyzbar'")
+            mode = "pyzbar"
+        self.mode = mode
+        self.trial = trial
+        self.retrial_every = retrial_every
+        self.stats = {name: BackendStats() for name in BACKENDS}
+        # One ThreadChoice per decode thread, it goes away with its thread. The weak
+        # set only lists the live ones for summary()
+        self._local = threading.local()
+        self._choices = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def __call__(self, image):
+        return self.decode(image)
+
+    def decode(self, image):
+        if self.mode != "auto":
+            return self._run(self.mode, image)
+
+        choice = self._choice()
+        chosen = choice.backend
+        if chosen is not None:
+            choice.left -= 1
+            if choice.left <= 0:
+                choice.reset(self.trial)
+            return self._run(chosen, image)
+
+        # Trial: both backends on the same frame, the result with more codes is used
+        results = []
+        for name in BACKENDS:
+            started = time.perf_counter()
+            barcodes = self._run(name, image)
+            trial = choice.results[name]
+            trial[0] += bool(barcodes)
+            trial[1] += time.perf_counter() - started
+            results.append(barcodes)
+        choice.left -= 1
+        if choice.left <= 0:
+            choice.backend = min(BACKENDS, key=lambda name: (-choice.results[name][0], choice.results[name][1]))
+            choice.left = self.retrial_every
+        return max(results, key=len)
+
+    def _choice(self):
+        choice = getattr(self._local, 'choice', None)
+        if choice is None:
+            choice = self._local.choice = ThreadChoice(self.trial)
+            with self._lock:
+                self._choices.add(choice)
+        return choice
+
+    def _run(self, name, image):
+        started = time.perf_counter()
+        barcodes = decode_with(name, image)
+        self.record(name, (time.perf_counter() - started) * 1000, barcodes)
+        return barcodes
+
+    def record(self, name, elapsed_ms, hit):
+        # Also for decodes that ran elsewhere with this backend (variant worker processes)
+        with self._lock:
+            self.stats[name].record(elapsed_ms, hit)
+
+    def current(self):
+        # Backend the calling thread decodes with right now
+        if self.mode != "auto":
+            return self.mode
+        choice = getattr(self._local, 'choice', None)
+        return choice.backend if choice is not None and choice.backend is not None else BACKENDS[0]
+
+    def summary(self):
+        parts = [f"{name} {stats.avg_ms:.1f} ms, {stats.hit_rate:.0%} Treffer"
+                 for name, stats in self.stats.items() if stats.calls]
+        text = f"Decoder {self.mode}"
+        if self.mode == "auto":
+            with self._lock:
+                chosen = [choice.backend or "Test" for choice in self._choices]
+            text += f" ({', '.join(chosen)})" if chosen else ""
+        return text + (": " + " | ".join(parts) if parts else "")
+
+    def export(self):
+        # Per-backend numbers for the metrics file and the benchmark report
+        with self._lock:
+            return {name: {"calls": stats.calls, "hits": stats.hits, "hit_rate": round(stats.hit_rate, 4),
+                           "avg_ms": round(stats.avg_ms, 3)}
+                    for name, stats in self.stats.items() if stats.calls}
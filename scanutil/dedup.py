@@ -0,0 +1,36 @@
+import time
+from collections import OrderedDict
+
+class DedupCache:
+    # A barcode is accepted again only after it was out of sight for `cooldown`
+    # seconds. Entries are kept in order of last sighting, so expired ones and,
+    # above `max_entries`, the least recently seen ones fall off the front
+    def __init__(self, cooldown=2.0, max_entries=1024, clock=time.monotonic):
+        self.cooldown = cooldown
+        self.max_entries = max_entries
+        self.clock = clock
+        self._last_seen = OrderedDict()
+
+    def accept(self, barcode, now=None):
+        now = self.clock() if now is None else now
+        self._evict(now)
+        last_seen = self._last_seen.pop(barcode, None)
+        self._last_seen[barcode] = now
+        return last_seen is None or now - last_seen > self.cooldown
+
+    def forget(self, barcode):
+        self._last_seen.pop(barcode, None)
+
+    def clear(self):
+        self._last_seen.clear()
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def _evict(self, now):
+        entries = self._last_seen
+        while entries:
+            barcode, last_seen = next(iter(entries.items()))
+            if now - last_seen <= self.cooldown and len(entries) < self.max_entries:
+                break
+            entries.popitem(last=False)
@@ -0,0 +1,81 @@
+import time
+import cv2
+
+GATE_SIZE = (320, 180)
+
+class FrameGate:
+    # Cheap check before the decoder runs, on a small grayscale copy of the frame:
+    # - blurry: even the sharpest tile has too little Laplacian variance
+    # - motion: too different from the previous checked frame, the bars are smeared
+    # - still: almost identical to the last decoded frame, the result would repeat.
+    #   Only for `max_still_s` after that decode, whatever the decode cadence is, so a
+    #   code held still still gets the agreeing decodes ReadValidator waits for
+    # A threshold of 0 turns that check off
+    def __init__(self, sharpness_min=25.0, motion_max=12.0, still_max=1.5, max_still_s=0.3, tiles=4,
+                 clock=time.monotonic):
+        self.sharpness_min = sharpness_min
+        self.motion_max = motion_max
+        self.still_max = still_max
+        self.max_still_s = max_still_s  # Keep it below the validator's confirm window
+        self.tiles = tiles
+        self.clock = clock
+
+        self._previous = None
+        self._decoded = None
+        self._decoded_at = 0.0
+
+        self.checked = 0
+        self.skipped = {"blurry": 0, "motion": 0, "still": 0}
+        self.sharpness = 0.0
+        self.motion = 0.0
+
+    def small(self, frame):
+        small = cv2.resize(frame, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def tile_sharpness(self, small):
+        # A barcode covers only part of the frame, so the sharpest tile counts
+        laplacian = cv2.Laplacian(small, cv2.CV_32F)
+        h, w = laplacian.shape
+        th, tw = h // self.tiles, w // self.tiles
+        tiles = laplacian[:th * self.tiles, :tw * self.tiles].reshape(self.tiles, th, self.tiles, tw)
+        return float(tiles.var(axis=(1, 3)).max())
+
+    def check(self, frame):
+        # True if the frame is worth decoding
+        self.checked += 1
+        small = self.small(frame)
+        previous, self._previous = self._previous, small
+
+        if self.motion_max and previous is not None:
+            self.motion = float(cv2.absdiff(small, previous).mean())
+            if self.motion > self.motion_max:
+                return self._skip("motion")
+
+        now = self.clock()
+        if self.still_max and self._decoded is not None and now - self._decoded_at < self.max_still_s:
+            if float(cv2.absdiff(small, self._decoded).mean()) < self.still_max:
+                return self._skip("still")
+
+        if self.sharpness_min:
+            self.sharpness = self.tile_sharpness(small)
+            if self.sharpness < self.sharpness_min:
+                return self._skip("blurry")
+
+        self._decoded = small
+        self._decoded_at = now
+        return True
+
+    def _skip(self, reason):
+        self.skipped[reason] += 1
+        return False
+
+    @property
+    def skip_ratio(self):
+        return sum(self.skipped.values()) / self.checked if self.checked else 0.0
+
+    def summary(self):
+        return (f"Übersprungen: {self.skip_ratio:.0%} (unscharf {self.skipped['blurry']}, "
+                f"Bewegung {self.skipped['motion']}, unverändert {self.skipped['still']})")
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+STAGES = ("read", "preprocess", "decode", "convert", "schedule")
+
+# Bucket upper bounds in ms, roughly 25% apart from 0.05 ms to 5 s
+BOUNDS_MS = tuple(round(0.05 * 1.25 ** i, 3) for i in range(52))
+
+class Histogram:
+    # Fixed buckets, recording a value allocates nothing, so it can sit on the hot path
+    def __init__(self, bounds=BOUNDS_MS):
+        self.bounds = bounds
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.counts[bisect_left(self.bounds, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, q):
+        # Upper bound of the bucket the q-th percentile falls into
+        if not self.count:
+            return 0.0
+        target = self.count * q / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+class ScannerMetrics:
+    # One histogram per stage of a scanner window, shared by all its cameras:
+    #   read: camera read, preprocess: grayscale + LUT/profile, decode: the whole
+    #   decode call (includes preprocess), convert: preview resize/RGB/PhotoImage,
+    #   schedule: how much later than requested the Tk poll ran.
+    # export() appends one JSON line per interval and starts a new interval
+    def __init__(self, name, path=None, interval_s=10.0):
+        self.name = name
+        self.path = path
+        self.interval_s = interval_s
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.errors = 0
+        self._expected = None
+        self._interval_start = time.monotonic()
+        self._lock = threading.Lock()  # Capture, decode and Tk threads all record
+
+    def record(self, stage, elapsed_ms):
+        with self._lock:
+            self.stages[stage].record(elapsed_ms)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def scheduled(self, delay_ms):
+        self._expected = time.perf_counter() + delay_ms / 1000
+
+    def polled(self):
+        # Call first thing in the scheduled Tk callback
+        if self._expected is not None:
+            self.record("schedule", max(0.0, (time.perf_counter() - self._expected) * 1000))
+            self._expected = None
+
+    def export_due(self):
+        return bool(self.path) and time.monotonic() - self._interval_start >= self.interval_s
+
+    def export(self, cameras=(), **extra):
+        with self._lock:
+            now = time.monotonic()
+            line = {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "scanner": self.name,
+                "interval_s": round(now - self._interval_start, 3),
+                "errors": self.errors,
+                "stages": {stage: histogram.summary() for stage, histogram in self.stages.items()},
+                "cameras": list(cameras),
+            }
+            line.update(extra)
+            for histogram in self.stages.values():
+                histogram.reset()
+            self.errors = 0
+            self._interval_start = now
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line) + '\n')
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
@@ -0,0 +1,136 @@
+import queue
+from scanutil.cadence import AdaptiveCadence
+from scanutil.gating import FrameGate
+from scanutil.pipeline import ScannerPipeline
+from scanutil.session import is_session
+from scanutil.tracking import TrackingDecoder
+from scanutil.validate import ReadValidator
+
+class CameraTile:
+    # One camera: its own pipeline (capture subscription + decode worker) and preview
+    def __init__(self, source, pipeline, renderer, validator=None):
+        self.source = source
+        self.pipeline = pipeline
+        self.renderer = renderer  # None without a preview (daemon)
+        self.validator = validator
+        self.barcodes = []  # Last result, drawn on the preview
+        self.preview_id = None
+
+    def render(self, overlay=False):
+        preview = self.pipeline.take_preview(self.preview_id) if self.renderer.due() else None
+        if preview is None:
+            return False
+        self.preview_id = preview.frame_id
+        try:
+            self.renderer.render(preview.image, self.barcodes,
+                                 self.pipeline.overlay_lines() if overlay else ())
+        finally:
+            preview.release()
+        return True
+
+class ScannerGroup:
+    # Runs one pipeline per camera. The decode workers run in parallel, the Tk thread
+    # drains all result queues into one stream that goes through a single dedup cache
+    def __init__(self, tiles, decoder=None):
+        self.tiles = tiles
+        self.decoder = decoder  # DecoderBackend shared by the tiles, for status and metrics
+        self.renders = 0
+        self.overlay = False  # Live numbers drawn on every preview
+
+    @property
+    def validators(self):
+        return [tile.validator for tile in self.tiles if tile.validator is not None]
+
+    @property
+    def running(self):
+        return any(tile.pipeline.running for tile in self.tiles)
+
+    # Focus settings go to every camera
+    @property
+    def autofocus(self):
+        return self.tiles[0].pipeline.autofocus
+
+    @autofocus.setter
+    def autofocus(self, value):
+        for tile in self.tiles:
+            tile.pipeline.autofocus = value
+
+    @property
+    def focus(self):
+        return self.tiles[0].pipeline.focus
+
+    @focus.setter
+    def focus(self, value):
+        for tile in self.tiles:
+            tile.pipeline.focus = value
+
+    def start(self):
+        for tile in self.tiles:
+            tile.pipeline.start()
+
+    def stop(self):
+        for tile in self.tiles:
+            tile.pipeline.stop()
+
+    def clear(self):
+        for tile in self.tiles:
+            tile.renderer.clear()
+
+    def drain(self):
+        # Yields (tile, frame_id, barcodes) for every finished decode of any camera
+        for tile in self.tiles:
+            while True:
+                try:
+                    frame_id, barcodes = tile.pipeline.results.get_nowait()
+                except queue.Empty:
+                    break
+                tile.barcodes = barcodes
+                yield tile, frame_id, barcodes
+
+    def render(self, status_every=15):
+        # True when the status text is due again, every `status_every` rendered previews
+        before = self.renders
+        self.renders += sum(tile.render(self.overlay) for tile in self.tiles)
+        return before // status_every != self.renders // status_every
+
+    def poll_interval_ms(self):
+        return min(tile.pipeline.poll_interval_ms() for tile in self.tiles)
+
+    def stats(self):
+        return [tile.pipeline.stats() for tile in self.tiles]
+
+    def decoder_stats(self):
+        return self.decoder.export() if self.decoder is not None else {}
+
+    def status_text(self):
+        if len(self.tiles) == 1:
+            text = self.tiles[0].pipeline.status_text()
+        else:
+            text = "\n".join(f"[{tile.source}] {tile.pipeline.status_text()}" for tile in self.tiles)
+        if self.decoder is not None:
+            text += f"\n{self.decoder.summary()}"
+        return text
+
+def build_scanner(settings, sources, decode, decoder=None, metrics=None, renderer=None):
+    # The per-camera chain of every scanner, from a settings section (scanner, uscan).
+    # `decode` turns a frame into barcodes, `renderer(index, source)` makes the
+    # preview of a camera; without it the tiles have no preview
+    tiles = []
+    for index, source in enumerate(sources):
+        # After a hit only the area around the last barcode is decoded
+        tracking_decoder = TrackingDecoder(decode)
+        # Check digit and agreement over several decodes, confirmed codes are not decoded again
+        validator = ReadValidator(tracking_decoder.decode, settings['confirm_frames'],
+                                  settings['confirm_window_s'], settings['region_cooldown_s'])
+        # Decode cadence adapts to the measured decode time
+        cadence = AdaptiveCadence(settings['target_latency_ms'], settings['max_decode_every'])
+        # Blurry, moving and unchanged frames never reach the decoder
+        gate = FrameGate(settings['gate_sharpness_min'], settings['gate_motion_max'], settings['gate_still_max'],
+                         settings['gate_max_still_s'])
+        # Recorded sessions can replay at full speed, cameras always run in real time
+        realtime = settings['replay_realtime'] or not is_session(source)
+        pipeline = ScannerPipeline(validator.decode, device=source, cadence=cadence, gate=gate, metrics=metrics,
+                                   realtime=realtime)
+        preview = renderer(index, source) if renderer is not None else None
+        tiles.append(CameraTile(source, pipeline, preview, validator))
+    return ScannerGroup(tiles, decoder)
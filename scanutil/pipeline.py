@@ -0,0 +1,224 @@
+import threading
+import queue
+import time
+from scanutil.cadence import AdaptiveCadence
+from scanutil.camera import broker
+
+class LatestFrameBuffer:
+    # Holds at most one frame, a newer frame replaces one that was not picked up yet.
+    # With block=True put() waits for the slot instead, nothing is dropped and the
+    # producer runs at the speed of the consumer (replay at full speed)
+    def __init__(self, block=False):
+        self._cond = threading.Condition()
+        self._item = None
+        self.block = block
+        self.dropped = 0
+
+    def put(self, item):
+        # Returns the replaced item so the caller can release it
+        with self._cond:
+            while self.block and self._item is not None:
+                self._cond.wait()
+            replaced, self._item = self._item, item
+            if replaced is not None:
+                self.dropped += 1
+            self._cond.notify()
+            return replaced
+
+    def get(self, timeout=None):
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            self._cond.notify_all()
+            return item
+
+    def unblock(self):
+        # Lets a waiting put() through, the consumer is going away
+        with self._cond:
+            self.block = False
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            item, self._item = self._item, None
+            self._cond.notify_all()
+            return item
+
+class RateCounter:
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.rate = 0.0
+        self._last = None
+
+    def tick(self, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._last is not None and now > self._last:
+            current = 1.0 / (now - self._last)
+            self.rate += (current - self.rate) * self.smoothing if self.rate else current
+        self._last = now
+
+class ScannerPipeline:
+    # Camera broker -> latest frame buffer -> decode worker -> results queue
+    # Tk only polls `results` and the preview, it never touches the camera itself.
+    # Frames are shared with other subscribers of the same device, so they are
+    # retained while this pipeline holds them and never modified.
+    # realtime=False replays a session as fast as it decodes: every frame is
+    # decoded and the replay waits for the worker instead of dropping frames
+    def __init__(self, decode, device=0, cadence=None, gate=None, metrics=None, realtime=True):
+        self.decode = decode
+        self.device = device
+        self.realtime = realtime
+        self.cadence = cadence or AdaptiveCadence()
+        self.gate = gate  # Optional FrameGate, skipped frames produce no result
+        self.metrics = metrics  # Optional ScannerMetrics, gets read and decode times
+        self.frame_id = 0
+
+        self.frames = LatestFrameBuffer(block=not realtime)
+        self.results = queue.Queue()
+        self._preview = None  # Latest Frame, replaced by the capture thread
+        self._preview_lock = threading.Lock()
+        self._camera = None
+
+        self._autofocus = None  # None keeps what the device profile says
+        self._focus = None
+
+        self.capture_rate = RateCounter()
+        self.decode_rate = RateCounter()
+
+        self.running = False
+        self._thread = None
+
+    # Set by the Tk thread, sent to the driver by the capture thread only on change
+    @property
+    def autofocus(self):
+        return self._autofocus
+
+    @autofocus.setter
+    def autofocus(self, value):
+        self._autofocus = value
+        self._request('autofocus', value)
+
+    @property
+    def focus(self):
+        return self._focus
+
+    @focus.setter
+    def focus(self, value):
+        self._focus = int(value)
+        self._request('focus', self._focus)
+
+    def _request(self, name, value):
+        if self._camera is not None and value is not None:
+            self._camera.controls.request(name, value)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.frames.block = not self.realtime
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+        self._camera = broker.subscribe(self.device, self._on_frame, self.realtime)
+        self._request('autofocus', self._autofocus)
+        self._request('focus', self._focus)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.frames.unblock()
+        broker.unsubscribe(self.device, self._on_frame)
+        self._camera = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        item = self.frames.clear()
+        if item is not None:
+            item.release()
+        with self._preview_lock:
+            preview, self._preview = self._preview, None
+        if preview is not None:
+            preview.release()
+
+    def take_preview(self, last_id=None):
+        # Newest frame if it differs from `last_id`, the caller has to release() it
+        with self._preview_lock:
+            preview = self._preview
+            if preview is None or preview.frame_id == last_id:
+                return None
+            return preview.retain()
+
+    def poll_interval_ms(self):
+        return self.cadence.poll_interval_ms(self.capture_rate.rate)
+
+    def status_text(self):
+        text = (f"Kamera: {self.capture_rate.rate:.0f} FPS | "
+                f"Dekodierung: {self.decode_rate.rate:.1f}/s (jeder {self.cadence.every}. Frame, "
+                f"{self.cadence.decode_ms:.0f} ms) | Rückstau: {self.cadence.backlog}")
+        if self.gate is not None:
+            text += f"\n{self.gate.summary()}"
+        return text
+
+    def overlay_lines(self):
+        # Short enough to be drawn on a small preview tile
+        return [f"{self.capture_rate.rate:.0f} FPS, Dekodierung {self.cadence.decode_ms:.0f} ms",
+                f"Warteschlange {self.cadence.backlog + self.results.qsize()}, verworfen {self.frames.dropped}"]
+
+    def stats(self):
+        # One camera's part of a metrics export
+        stats = {
+            "camera": self.device,
+            "fps": round(self.capture_rate.rate, 1),
+            "decode_rate": round(self.decode_rate.rate, 2),
+            "decode_ms": round(self.cadence.decode_ms, 1),
+            "decode_every": self.cadence.every,
+            "backlog": self.cadence.backlog,
+            "dropped": self.frames.dropped,
+        }
+        if self.gate is not None:
+            stats["gate_skipped"] = round(self.gate.skip_ratio, 3)
+        return stats
+
+    def _on_frame(self, frame):
+        # Runs in the capture thread of the device, has to return quickly
+        if not self.running:
+            return
+        self.capture_rate.tick(frame.timestamp)
+        self.frame_id = frame.frame_id
+        if self.metrics is not None:
+            self.metrics.record('read', frame.read_ms)
+        with self._preview_lock:
+            replaced, self._preview = self._preview, frame.retain()
+        if replaced is not None:
+            replaced.release()
+        if not self.realtime or self.cadence.should_decode(frame.frame_id):
+            replaced = self.frames.put(frame.retain())
+            if replaced is not None:
+                replaced.release()
+
+    def _decode_loop(self):
+        while self.running:
+            frame = self.frames.get(timeout=0.1)
+            if frame is None:
+                continue
+            if self.gate is not None and not self.gate.check(frame.image):
+                frame.release()
+                continue
+            started = time.perf_counter()
+            try:
+                barcodes = self.decode(frame.image)
+            except Exception as e:
+                print(f"Error in decode worker: {e}")
+                if self.metrics is not None:
+                    self.metrics.error()
+                continue
+            finally:
+                frame.release()
+            finished = time.perf_counter()
+            if self.metrics is not None:
+                self.metrics.record('decode', (finished - started) * 1000)
+            self.decode_rate.tick(finished)
+            self.cadence.record_decode(finished - started, finished - frame.timestamp,
+                                       self.capture_rate.rate, self.frame_id - frame.frame_id)
+            self.results.put((frame.frame_id, barcodes))
@@ -0,0 +1,64 @@
+import time
+import cv2
+import numpy as np
+
+# Which stages run after the brightness/contrast lookup table
+PROFILES = {
+    "plain": {"blur": False, "threshold": False},
+    "blur": {"blur": True, "threshold": False},
+    "threshold": {"blur": True, "threshold": True},
+}
+
+IDENTITY = np.arange(256, dtype=np.uint8).reshape(1, 256)
+
+def build_lut(brightness, contrast):
+    # convertScaleAbs with the slider values (0-100, 50 = unchanged) applied to all
+    # 256 gray values once, so the table rounds exactly like OpenCV does per frame
+    alpha = contrast / 50.0
+    beta = (brightness / 50.0 - 1.0) * 127
+    return cv2.convertScaleAbs(IDENTITY, alpha=alpha, beta=beta).ravel()
+
+def preprocess(gray, lut=None, profile="plain"):
+    stages = PROFILES[profile]
+    if lut is not None:
+        gray = cv2.LUT(gray, lut)
+    if stages["blur"]:
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    if stages["threshold"]:
+        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY, 11, 2)
+    return gray
+
+class Preprocessor:
+    # The lookup table is only rebuilt when a slider really moved
+    def __init__(self, profile="plain", smoothing=0.1):
+        if profile not in PROFILES:
+            print(f"Unknown preprocess profile '{profile}', using 'plain'")
+            profile = "plain"
+        self.profile = profile
+        self.smoothing = smoothing
+        self.levels = (50, 50)
+        self.lut = None  # None = identity, nothing to do
+        self.lut_builds = 0
+        self.avg_ms = 0.0
+        self.metrics = None  # Optional ScannerMetrics
+
+    def set_levels(self, brightness, contrast):
+        levels = (brightness, contrast)
+        if levels == self.levels:
+            return
+        self.levels = levels
+        self.lut = None if levels == (50, 50) else build_lut(brightness, contrast)
+        self.lut_builds += 1
+
+    def record(self, elapsed_ms):
+        self.avg_ms += (elapsed_ms - self.avg_ms) * self.smoothing if self.avg_ms else elapsed_ms
+        if self.metrics is not None:
+            self.metrics.record('preprocess', elapsed_ms)
+
+    def apply(self, frame):
+        started = time.perf_counter()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = preprocess(gray, self.lut, self.profile)
+        self.record((time.perf_counter() - started) * 1000)
+        return gray
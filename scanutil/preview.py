@@ -0,0 +1,86 @@
+import math
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+from tkinter import ttk
+
+def tile_labels(parent, count, max_size):
+    # One preview label per camera in a near-square grid, returns the labels and
+    # the largest preview size that still fits each tile
+    for child in parent.winfo_children():
+        child.destroy()
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    labels = []
+    for index in range(count):
+        label = ttk.Label(parent)
+        label.grid(row=index // columns, column=index % columns, sticky="nsew")
+        labels.append(label)
+    for column in range(columns):
+        parent.columnconfigure(column, weight=1)
+    for row in range(rows):
+        parent.rowconfigure(row, weight=1)
+    return labels, (max_size[0] // columns, max_size[1] // rows)
+
+class PreviewRenderer:
+    # Scales the frame down to the size the label really has before any color
+    # conversion and pastes into one PhotoImage instead of allocating a new one
+    def __init__(self, label, max_size=(960, 540), max_fps=20, metrics=None):
+        self.label = label
+        self.max_size = tuple(max_size)
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.metrics = metrics  # Optional ScannerMetrics, gets the conversion time
+        self.photo = None
+        self._last = 0.0
+
+    def target_size(self, frame):
+        frame_h, frame_w = frame.shape[:2]
+        max_w, max_h = self.max_size
+        label_w, label_h = self.label.winfo_width(), self.label.winfo_height()
+        if label_w > 1 and label_h > 1:
+            max_w, max_h = min(max_w, label_w), min(max_h, label_h)
+        scale = min(1.0, max_w / frame_w, max_h / frame_h)
+        return max(1, int(frame_w * scale)), max(1, int(frame_h * scale)), scale
+
+    def due(self):
+        return time.perf_counter() - self._last >= self.min_interval
+
+    def render(self, frame, barcodes=(), overlay=()):
+        # Preview FPS is throttled on its own, independent of the decode rate
+        if not self.due():
+            return None
+        started = self._last = time.perf_counter()
+
+        width, height, scale = self.target_size(frame)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        for barcode in barcodes:
+            points = barcode.polygon
+            if len(points) == 4:
+                pts = (np.array([(p.x, p.y) for p in points]) * scale).astype(np.int32)
+                cv2.polylines(rgb, [cv2.convexHull(pts)], True, (0, 255, 0), 2)
+
+        # Text lines drawn after scaling, so they stay readable on small tiles
+        for index, line in enumerate(overlay):
+            origin = (8, 20 + index * 20)
+            cv2.putText(rgb, line, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(rgb, line, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1, cv2.LINE_AA)
+
+        image = Image.fromarray(rgb)
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == image.size:
+            self.photo.paste(image)
+        else:
+            self.photo = ImageTk.PhotoImage(image=image)
+            self.label.imgtk = self.photo
+            self.label.configure(image=self.photo)
+        if self.metrics is not None:
+            self.metrics.record('convert', (time.perf_counter() - started) * 1000)
+        return True
+
+    def clear(self):
+        self.photo = None
+        self.label.imgtk = None
+        self.label.configure(image='')
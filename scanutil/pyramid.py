@@ -0,0 +1,75 @@
+import cv2
+from scanutil.variants import transform_barcode
+
+def find_barcode_region(gray, min_area_ratio=0.002):
+    # Bars give strong gradients in one direction only, close them into a blob
+    grad_x = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+    grad_y = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 0, 1, ksize=3))
+    gradient = cv2.absdiff(grad_x, grad_y)
+    blurred = cv2.blur(gradient, (9, 9))
+    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 7))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.erode(mask, None, iterations=4)
+    mask = cv2.dilate(mask, None, iterations=4)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    if w * h < min_area_ratio * gray.shape[0] * gray.shape[1]:
+        return None
+    return x, y, w, h
+
+class PyramidDecoder:
+    # Tries downscaled images first (coarse to fine), then decodes only the
+    # likely barcode region at full resolution
+    def __init__(self, decode, scales=(0.5,), refine=None, full_fallback=False, margin=0.25):
+        self.decode_image = decode
+        self.refine = refine or decode
+        self.scales = sorted(scales)
+        self.full_fallback = full_fallback
+        self.margin = margin
+
+        # Which scale delivered the result (1.0 = full resolution, None = nothing found)
+        self.last_scale = None
+        self.scale_hits = {}
+
+    def _record(self, scale, barcodes):
+        self.last_scale = scale if barcodes else None
+        self.scale_hits[self.last_scale] = self.scale_hits.get(self.last_scale, 0) + 1
+        return barcodes
+
+    def decode(self, image):
+        if not self.scales:
+            return self._record(1.0, self.decode_image(image))
+
+        small = None
+        for scale in self.scales:
+            small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            barcodes = self.decode_image(small)
+            if barcodes:
+                return self._record(scale, [transform_barcode(barcode, 1.0 / scale) for barcode in barcodes])
+
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        region = find_barcode_region(gray)
+        if region is None:
+            barcodes = self.refine(image) if self.full_fallback else []
+            return self._record(1.0, barcodes)
+
+        # Map the coarse region back to full resolution, with some margin around it
+        scale = self.scales[-1]
+        x, y, w, h = (int(v / scale) for v in region)
+        pad_x, pad_y = int(w * self.margin), int(h * self.margin)
+        height, width = image.shape[:2]
+        left, top = max(0, x - pad_x), max(0, y - pad_y)
+        right, bottom = min(width, x + w + pad_x), min(height, y + h + pad_y)
+        barcodes = self.refine(image[top:bottom, left:right])
+        return self._record(1.0, [transform_barcode(barcode, dx=left, dy=top) for barcode in barcodes])
+
+    def summary(self):
+        parts = [f"{scale:g}x: {count}" for scale, count in sorted(
+            ((s, c) for s, c in self.scale_hits.items() if s is not None))]
+        parts.append(f"keine: {self.scale_hits.get(None, 0)}")
+        return "Skala " + ", ".join(parts)
@@ -0,0 +1,129 @@
+import struct
+from collections import deque
+from tkinter import ttk
+
+LOG_FILE = 'uscan_scans.log'
+
+# Fixed-width records, so row n of the disk log is at n * RECORD.size
+RECORD = struct.Struct('<19s32s8sd')  # time, barcode, Pfand type, deposit
+
+class ScanLog:
+    # Newest rows live in a ring buffer of `capacity` rows, a row that falls out of
+    # it is appended to the disk log. Row 0 is the newest scan. The log belongs to
+    # one session, the file is emptied when it is opened
+    def __init__(self, path=LOG_FILE, capacity=500):
+        self.path = path
+        self.recent = deque()
+        self.capacity = capacity
+        self.spilled = 0
+        self._file = open(path, 'w+b')
+
+    def __len__(self):
+        return self.spilled + len(self.recent)
+
+    def append(self, row):
+        self.recent.append(row)
+        if len(self.recent) > self.capacity:
+            self._spill(self.recent.popleft())
+
+    def _spill(self, row):
+        time_text, barcode, pfand_type, deposit = row
+        self._file.seek(0, 2)
+        self._file.write(RECORD.pack(time_text.encode('utf-8'), barcode.encode('utf-8'),
+                                     pfand_type.encode('utf-8'), deposit))
+        self.spilled += 1
+
+    def rows(self, start, count):
+        # Rows start .. start + count - 1, newest first
+        count = max(0, min(count, len(self) - start))
+        recent = len(self.recent)
+        rows = [self.recent[-1 - index] for index in range(start, min(start + count, recent))]
+
+        # The rest comes from disk, in one read
+        if len(rows) < count:
+            first = max(start, recent)
+            last = start + count - 1
+            newest = self.spilled - 1 - (first - recent)
+            oldest = self.spilled - 1 - (last - recent)
+            self._file.flush()
+            self._file.seek(oldest * RECORD.size)
+            data = self._file.read((newest - oldest + 1) * RECORD.size)
+            spilled = [self._unpack(record) for record in RECORD.iter_unpack(data)]
+            rows.extend(reversed(spilled))
+        return rows
+
+    def _unpack(self, record):
+        time_text, barcode, pfand_type, deposit = record
+        return (time_text.rstrip(b'\0').decode('utf-8'), barcode.rstrip(b'\0').decode('utf-8', errors='replace'),
+                pfand_type.rstrip(b'\0').decode('utf-8'), deposit)
+
+    def close(self):
+        self._file.close()
+
+class ScanLogView:
+    # A Treeview that only holds as many items as fit on screen. Scrolling moves a
+    # window over the ScanLog and rewrites the values of those items, so the widget
+    # costs the same after ten scans or a hundred thousand
+    def __init__(self, parent, log, columns, format_row):
+        self.log = log
+        self.format_row = format_row
+        self.top = 0  # Index of the first visible row
+        self.slots = []
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings")
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+        self.visible = 20
+
+        self.tree.bind("<Configure>", self.on_resize)
+        # Windows and macOS send <MouseWheel>, X11 sends Button-4/5
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "units"))
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        self.visible = max(1, (event.height - row_height - 4) // row_height)
+        self.refresh()
+
+    def on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small values like 1 or 3,
+        # every event scrolls at least one row in its direction
+        if not event.delta:
+            return "break"
+        rows = max(1, abs(event.delta) // 120)
+        return self.scroll("scroll", -rows if event.delta > 0 else rows, "units")
+
+    def appended(self, count=1):
+        # Keeps the same rows in view while the user looks at older scans
+        if self.top:
+            self.top += count
+        self.refresh()
+
+    def scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.log))
+        elif unit == "pages":
+            self.top += int(amount) * self.visible
+        else:
+            self.top += int(amount)
+        self.refresh()
+        return "break"
+
+    def refresh(self):
+        total = len(self.log)
+        self.top = max(0, min(self.top, total - self.visible))
+        rows = self.log.rows(self.top, self.visible)
+
+        while len(self.slots) < len(rows):
+            self.slots.append(self.tree.insert("", "end", values=()))
+        for slot, row in zip(self.slots, rows):
+            self.tree.item(slot, values=self.format_row(row))
+        while len(self.slots) > len(rows):
+            self.tree.delete(self.slots.pop())
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
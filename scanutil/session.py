@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from scanutil.camera import SESSION_SUFFIX, broker
+
+# A recorded scanner session: a JSON header padded to HEADER_SIZE bytes, followed
+# by fixed-size records (timestamp, frame id, raw BGR frame). Both the recorder
+# and the replay access the records through np.memmap
+HEADER_SIZE = 4096
+GROW_FRAMES = 64
+
+def record_dtype(width, height):
+    return np.dtype([('timestamp', '<f8'), ('frame_id', '<i8'), ('image', 'u1', (height, width, 3))])
+
+def is_session(path):
+    return isinstance(path, str) and path.lower().endswith(SESSION_SUFFIX)
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        header = json.loads(f.read(HEADER_SIZE).rstrip(b'\0').decode('utf-8'))
+    if header.get('format') != 'pfand-session':
+        raise ValueError(f"Keine Scanner Aufnahme: {path}")
+    return header
+
+def write_header(f, header):
+    data = json.dumps(header).encode('utf-8')
+    f.seek(0)
+    f.write(data.ljust(HEADER_SIZE, b'\0'))
+
+class SessionRecorder:
+    # Subscribes to a camera device and copies every frame into the session file.
+    # The file grows in chunks of GROW_FRAMES records and is cut to size on stop
+    def __init__(self, path, source=0):
+        self.path = path
+        self.source = source
+        self.frames = 0
+        self.recording = False
+        self._records = None
+        self._dtype = None
+        self._capacity = 0
+        self._started = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.recording:
+            return
+        self.frames = 0
+        self._records = None
+        self._capacity = 0
+        self._started = None
+        with open(self.path, 'wb') as f:
+            write_header(f, {'format': 'pfand-session', 'version': 1, 'frames': 0})
+        self.recording = True
+        broker.subscribe(self.source, self._on_frame)
+
+    def stop(self):
+        if not self.recording:
+            return
+        broker.unsubscribe(self.source, self._on_frame)
+        with self._lock:
+            self.recording = False
+            if self._records is not None:
+                self._records.flush()
+                self._records = None
+        size = HEADER_SIZE + self.frames * (self._dtype.itemsize if self._dtype else 0)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size)
+            header = {'format': 'pfand-session', 'version': 1, 'frames': self.frames}
+            if self._dtype is not None:
+                height, width = self._dtype['image'].shape[:2]
+                header.update(width=width, height=height)
+            write_header(f, header)
+
+    def _grow(self, shape):
+        if self._dtype is None:
+            self._dtype = record_dtype(shape[1], shape[0])
+        # Windows does not resize a file that is still mapped, the old map goes first.
+        # The capacity only grows once the new map exists, a failed grow is retried
+        # with the next frame
+        if self._records is not None:
+            self._records.flush()
+            del self._records
+            self._records = None
+        capacity = self._capacity + GROW_FRAMES
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + capacity * self._dtype.itemsize)
+        self._records = np.memmap(self.path, dtype=self._dtype, mode='r+',
+                                  offset=HEADER_SIZE, shape=(capacity,))
+        self._capacity = capacity
+
+    def _on_frame(self, frame):
+        # Runs in the capture thread, one memcpy into the page cache per frame
+        with self._lock:
+            if not self.recording:
+                return
+            if self._dtype is not None and frame.image.shape != self._dtype['image'].shape:
+                return
+            if self.frames >= self._capacity:
+                self._grow(frame.image.shape)
+            if self._started is None:
+                self._started = frame.timestamp
+            record = self._records[self.frames]
+            record['timestamp'] = frame.timestamp - self._started
+            record['frame_id'] = frame.frame_id
+            record['image'] = frame.image
+            self.frames += 1
+
+class ReplayCapture:
+    # Plays a session back with the part of the cv2.VideoCapture interface the
+    # scanner uses. realtime=True keeps the recorded frame timing, otherwise the
+    # frames come as fast as they are read
+    virtual = True  # No driver behind it, camera controls are not sent
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        header = read_header(path)
+        self.width = header.get('width', 0)
+        self.height = header.get('height', 0)
+        self.count = header['frames']
+        self._records = None
+        if self.count:
+            self._records = np.memmap(path, dtype=record_dtype(self.width, self.height), mode='r',
+                                      offset=HEADER_SIZE, shape=(self.count,))
+        self.position = 0
+        self._started = None
+
+    def isOpened(self):
+        return self._records is not None
+
+    def read(self, image=None):
+        if self._records is None:
+            return False, None
+        if self.position >= self.count:
+            if not self.loop:
+                return False, None
+            self.position = 0
+            self._started = None
+
+        record = self._records[self.position]
+        if self.realtime:
+            now = time.perf_counter()
+            if self._started is None:
+                self._started = now - record['timestamp']
+            delay = self._started + record['timestamp'] - now
+            if delay > 0:
+                time.sleep(delay)
+        self.position += 1
+
+        if image is not None and image.shape == record['image'].shape:
+            np.copyto(image, record['image'])
+            return True, image
+        return True, np.array(record['image'])
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS:
+            if self.count < 2:
+                return 0.0
+            duration = float(self._records[-1]['timestamp'])
+            return (self.count - 1) / duration if duration else 0.0
+        if prop == cv2.CAP_PROP_POS_MSEC and self.position:
+            return float(self._records[self.position - 1]['timestamp']) * 1000
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = max(0, min(int(value), self.count))
+            self._started = None
+            return True
+        return False
+
+    def release(self):
+        self._records = None
+
+def session_path(folder='.'):
+    return os.path.join(folder, time.strftime('scan_%Y%m%d_%H%M%S') + SESSION_SUFFIX)
@@ -0,0 +1,61 @@
+from scanutil.variants import transform_barcode
+
+class RoiTracker:
+    # After a detection only an enlarged box around the last polygons is decoded,
+    # a full frame scan every `full_scan_every` frames still picks up new codes
+    def __init__(self, margin=0.5, full_scan_every=8, max_misses=5):
+        self.margin = margin
+        self.full_scan_every = full_scan_every
+        self.max_misses = max_misses
+        self.roi = None
+        self.misses = 0
+        self.frame_index = 0
+
+    def region(self, shape):
+        self.frame_index += 1
+        if self.roi is None or self.frame_index % self.full_scan_every == 0:
+            return None
+        return self.roi
+
+    def update(self, barcodes, shape, region):
+        if barcodes:
+            self.roi = self._enclosing_box(barcodes, shape)
+            self.misses = 0
+        elif region is None:
+            # Nothing anywhere in the frame, the code has left the picture
+            self.roi = None
+        else:
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.roi = None
+
+    def _enclosing_box(self, barcodes, shape):
+        xs = [p.x for barcode in barcodes for p in barcode.polygon]
+        ys = [p.y for barcode in barcodes for p in barcode.polygon]
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+        pad_x = int((right - left) * self.margin) + 16
+        pad_y = int((bottom - top) * self.margin) + 16
+        height, width = shape[:2]
+        x = max(0, left - pad_x)
+        y = max(0, top - pad_y)
+        return (x, y, min(width, right + pad_x) - x, min(height, bottom + pad_y) - y)
+
+class TrackingDecoder:
+    def __init__(self, decode, tracker=None):
+        self.decode_frame = decode
+        self.tracker = tracker or RoiTracker()
+        self.roi_decodes = 0
+        self.full_decodes = 0
+
+    def decode(self, frame):
+        region = self.tracker.region(frame.shape)
+        if region is None:
+            self.full_decodes += 1
+            barcodes = self.decode_frame(frame)
+        else:
+            self.roi_decodes += 1
+            x, y, w, h = region
+            barcodes = [transform_barcode(barcode, dx=x, dy=y)
+                        for barcode in self.decode_frame(frame[y:y + h, x:x + w])]
+        self.tracker.update(barcodes, frame.shape, region)
+        return barcodes
@@ -0,0 +1,130 @@
+import time
+import cv2
+
+# Symbologies with a GTIN check digit, everything else is passed through
+GTIN_TYPES = ('EAN13', 'EAN8', 'UPCA', 'UPCE')
+
+def check_digit(digits):
+    # GTIN check digit for the digits without it (EAN-8, UPC-A, EAN-13)
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits)))
+    return str((10 - total % 10) % 10)
+
+def expand_upce(code):
+    # 8 digit UPC-E (number system, 6 digits, check) to the 12 digit UPC-A it stands for
+    system, d, check = code[0], code[1:7], code[7]
+    if d[5] in '012':
+        body = d[0:2] + d[5] + '0000' + d[2:5]
+    elif d[5] == '3':
+        body = d[0:3] + '00000' + d[3:5]
+    elif d[5] == '4':
+        body = d[0:4] + '00000' + d[4]
+    else:
+        body = d[0:5] + '0000' + d[5]
+    return system + body + check
+
+def valid_code(code, symbology=None):
+    if symbology is not None and symbology not in GTIN_TYPES:
+        return True
+    if not code.isdigit():
+        return False
+    if symbology == 'UPCE' and len(code) == 8:
+        code = expand_upce(code)
+    if len(code) not in (8, 12, 13):
+        return False
+    return check_digit(code[:-1]) == code[-1]
+
+class ReadValidator:
+    # Sits in front of the decoder in the decode worker:
+    # - reads with a wrong check digit are dropped
+    # - a code only counts after `required` decodes agreed on it within `window_s`
+    # - a confirmed code's region is masked for `cooldown_s`. While the region still
+    #   looks like it did at confirmation, the code is reported without decoding it
+    #   again; once it changes the mask is dropped and the region decoded normally
+    def __init__(self, decode, required=2, window_s=1.0, cooldown_s=1.0, margin=0.25,
+                 changed_above=12.0, clock=time.monotonic):
+        self.decode_frame = decode
+        self.required = required
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.margin = margin
+        self.changed_above = changed_above
+        self.clock = clock
+
+        self._candidates = {}  # code -> (count, last read)
+        self._confirmed = {}  # code -> (barcode, region, snapshot, until)
+
+        self.rejected = 0
+        self.held = 0
+
+    def decode(self, frame):
+        now = self.clock()
+        gray = self._gray(frame) if self._confirmed else None
+
+        held, masked = [], None
+        for code, (barcode, region, snapshot, until) in list(self._confirmed.items()):
+            if now > until or self._changed(gray, region, snapshot):
+                del self._confirmed[code]
+                continue
+            held.append(barcode)
+            if masked is None:
+                masked = frame.copy()
+            x, y, w, h = region
+            masked[y:y + h, x:x + w] = 255
+        self.held += len(held)
+
+        barcodes = self.decode_frame(frame if masked is None else masked)
+        if barcodes and gray is None:
+            gray = self._gray(frame)
+        return held + self._confirm(barcodes, gray, now)
+
+    def _gray(self, frame):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _confirm(self, barcodes, gray, now):
+        confirmed = []
+        for barcode in barcodes:
+            code = barcode.data.decode('utf-8', errors='replace')
+            if not valid_code(code, getattr(barcode, 'type', None)):
+                self.rejected += 1
+                continue
+            count, last = self._candidates.get(code, (0, now))
+            count = count + 1 if now - last <= self.window_s else 1
+            self._candidates[code] = (count, now)
+            if count < self.required:
+                continue
+            del self._candidates[code]
+            confirmed.append(barcode)
+            if self.cooldown_s:
+                region = self._region(barcode, gray.shape)
+                self._confirmed[code] = (barcode, region, self._snapshot(gray, region), now + self.cooldown_s)
+
+        # Partial reads that never got confirmed
+        for code, (count, last) in list(self._candidates.items()):
+            if now - last > self.window_s:
+                del self._candidates[code]
+        return confirmed
+
+    def _region(self, barcode, shape):
+        # Linear codes often come back as a thin scan line, so the height is padded
+        # relative to the width as well
+        xs = [p.x for p in barcode.polygon]
+        ys = [p.y for p in barcode.polygon]
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+        pad_x = int((right - left) * self.margin) + 8
+        pad_y = max(int((bottom - top) * self.margin), int((right - left) * 0.35)) + 8
+        height, width = shape[:2]
+        x = max(0, left - pad_x)
+        y = max(0, top - pad_y)
+        return (x, y, min(width, right + pad_x) - x, min(height, bottom + pad_y) - y)
+
+    def _snapshot(self, gray, region):
+        x, y, w, h = region
+        return cv2.resize(gray[y:y + h, x:x + w], (32, 32), interpolation=cv2.INTER_AREA)
+
+    def _changed(self, gray, region, snapshot):
+        return float(cv2.absdiff(self._snapshot(gray, region), snapshot).mean()) > self.changed_above
+
+def validation_summary(validators):
+    rejected = sum(validator.rejected for validator in validators)
+    held = sum(validator.held for validator in validators)
+    return f"Prüfziffer falsch: {rejected} | Ohne Dekodierung gehalten: {held}"
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import time
+import cv2
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pyzbar.locations import Point, Rect
+from scanutil.decoders import decode_with
+from scanutil.preprocess import Preprocessor, preprocess
+
+# Preprocessing variants, tried in parallel for every frame
+# "adjusted" runs the slider lookup table and the stages of the preprocess profile
+VARIANTS = ("gray", "adjusted", "stretched", "downscaled")
+
+def transform_barcode(barcode, scale=1.0, dx=0, dy=0):
+    # Maps a result from a scaled/cropped image back to frame coordinates
+    polygon = [Point(int(p.x * scale) + dx, int(p.y * scale) + dy) for p in barcode.polygon]
+    rect = barcode.rect
+    rect = Rect(int(rect.left * scale) + dx, int(rect.top * scale) + dy,
+                int(rect.width * scale), int(rect.height * scale))
+    return barcode._replace(polygon=polygon, rect=rect)
+
+def make_variant(gray, name, lut=None, profile="threshold"):
+    if name == "adjusted":
+        return preprocess(gray, lut, profile), 1.0
+    if name == "stretched":
+        return cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX), 1.0
+    if name == "downscaled":
+        return cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA), 0.5
+    return gray, 1.0
+
+def decode_variant(gray, name, lut=None, profile="threshold", backend="pyzbar"):
+    # Runs in a worker process
+    started = time.perf_counter()
+    image, scale = make_variant(gray, name, lut, profile)
+    decode_started = time.perf_counter()
+    preprocess_ms = (decode_started - started) * 1000
+    barcodes = decode_with(backend, image)
+    decode_ms = (time.perf_counter() - decode_started) * 1000
+    if scale != 1.0:
+        barcodes = [transform_barcode(barcode, 1.0 / scale) for barcode in barcodes]
+    return name, barcodes, preprocess_ms, decode_ms
+
+class MultiVariantDecoder:
+    def __init__(self, variants=VARIANTS, workers=None, profile="threshold", backend=None):
+        self.variants = variants
+        # DecoderBackend of the coarse pass, the workers use what it chose for the calling camera
+        self.backend = backend
+        self.workers = workers or min(len(variants), os.cpu_count() or 1)
+        # Spawned workers, forking the Tk process with its capture and decode threads
+        # running can copy held locks into the child
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+
+        # Lookup table from the sliders for the adjusted variant, timing of that variant
+        self.preprocessor = Preprocessor(profile)
+
+        # Which variant delivered the result, useful for tuning
+        self.hits = {name: 0 for name in variants}
+        self.misses = 0
+
+    def decode(self, frame):
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        lut, profile = self.preprocessor.lut, self.preprocessor.profile
+        backend = self.backend.current() if self.backend is not None else "pyzbar"
+        # At most one variant per worker is submitted, the next one when a variant found
+        # nothing. After the first hit the remaining variants are never submitted,
+        # variants already running finish in their worker and are ignored
+        waiting = list(self.variants)
+        pending = set()
+        while waiting or pending:
+            while waiting and len(pending) < self.workers:
+                pending.add(self.pool.submit(decode_variant, gray, waiting.pop(0), lut, profile, backend))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, barcodes, preprocess_ms, decode_ms = future.result()
+                if name == "adjusted":
+                    self.preprocessor.record(preprocess_ms)
+                if self.backend is not None:
+                    # The workers decode outside the DecoderBackend, their time goes into its stats here
+                    self.backend.record(backend, decode_ms, barcodes)
+                if barcodes:
+                    self.hits[name] += 1
+                    return barcodes
+        self.misses += 1
+        return []
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,82 @@
+import json
+
+SETTINGS_FILE = 'settings.json'
+
+# Defaults per section, values from settings.json override them
+DEFAULT_SETTINGS = {
+    "scanner": {
+        "cameras": [0],  # Camera indices, each one gets its own capture and decode worker
+        "target_latency_ms": 150,
+        "max_decode_every": 10,
+        "pyramid_scales": [0.5],  # Empty list decodes at full resolution only
+        "pyramid_full_fallback": False,
+        "decoder": "pyzbar",  # pyzbar, opencv (cv2.barcode) or auto (tries both per camera, keeps the better one)
+        "preview_max_size": [960, 540],
+        "preview_fps": 20,
+        "preprocess_profile": "plain",  # plain, blur or threshold
+        "dedup_cooldown_s": 2.0,  # Seconds out of sight before the same barcode counts again
+        "dedup_max_entries": 1024,
+        "gate_sharpness_min": 25.0,  # Laplacian variance of the sharpest tile, 0 turns a check off
+        "gate_motion_max": 12.0,  # Mean difference to the previous frame (0-255)
+        "gate_still_max": 1.5,  # Below this the frame counts as unchanged
+        "gate_max_still_s": 0.3,  # Unchanged frames are decoded again after this, keep it below confirm_window_s
+        "confirm_frames": 2,  # Decodes that have to agree on a code before it counts
+        "confirm_window_s": 1.0,
+        "region_cooldown_s": 1.0,  # Confirmed region is not decoded again, keep it below dedup_cooldown_s
+        "replay_realtime": True,  # False replays sessions as fast as they decode, every frame is decoded
+        "metrics_file": "scanner_metrics.jsonl",  # Per-stage timings every metrics_interval_s, "" = off
+        "metrics_interval_s": 10.0,
+    },
+    "uscan": {
+        "cameras": [0],
+        "target_latency_ms": 150,
+        "max_decode_every": 10,
+        "pyramid_scales": [0.5],
+        "pyramid_full_fallback": True,
+        "decoder": "pyzbar",
+        "preview_max_size": [960, 540],
+        "preview_fps": 20,
+        "preprocess_profile": "threshold",
+        "dedup_cooldown_s": 2.0,
+        "dedup_max_entries": 1024,
+        "gate_sharpness_min": 25.0,
+        "gate_motion_max": 12.0,
+        "gate_still_max": 1.5,
+        "gate_max_still_s": 0.3,
+        "confirm_frames": 2,
+        "confirm_window_s": 1.0,
+        "region_cooldown_s": 1.0,
+        "replay_realtime": True,
+        "scan_log_rows": 500,  # Scan log rows kept in memory, older ones are read back from uscan_scans.log
+        "metrics_file": "uscan_metrics.jsonl",
+        "metrics_interval_s": 10.0,
+    },
+    "batch": {
+        "pyramid_scales": [0.5],
+        "pyramid_full_fallback": True,
+        "decoder": "pyzbar",
+        "preprocess_profile": "plain",
+        "every": 1,
+        "cooldown_s": 2.0,
+    },
+    "daemon": {
+        "host": "127.0.0.1",  # python -m scanutil.daemon, the calculator connects to the same address
+        "port": 8765,
+        "heartbeat_s": 5.0,
+    },
+    "storage": {
+        "quantity_flush_interval_s": 10,
+        "deposit_backend": "journal",  # journal (deposit_history.jsonl) or sqlite (deposit_history.db)
+    },
+}
+
+def load_settings(section):
+    settings = dict(DEFAULT_SETTINGS.get(section, {}))
+    try:
+        with open(SETTINGS_FILE, 'r') as f:
+            settings.update(json.load(f).get(section, {}))
+    except FileNotFoundError:
+        pass
+    except json.JSONDecodeError as e:
+        print(f"Error reading {SETTINGS_FILE}: {e}")
+    return settings